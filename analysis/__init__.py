@@ -1 +1 @@
-from analysis import pool, separate, a_priori, batch
+from analysis import density, pool, separate, a_priori, batch
@@ -1 +1,2 @@
 from . plot import *
+from . statistics import batch_statistics, compare, difference_ci, permutation_test
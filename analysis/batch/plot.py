@@ -3,39 +3,17 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec
 
-from . import customized_plot
+from . import customized_plot, statistics
 
 
 def plot(batch_backup, fig_name=None, subplot_spec=None):
 
     # ----------------- Data ------------------- #
 
-    # Look at the parameters
-    n_simulations = len(batch_backup.backups)
-    n_positions = batch_backup.parameters["n_positions"]
+    # Mean distance between the two firms, mean price and mean profit over the whole simulation
+    r, metrics = statistics.batch_metrics(batch_backup)
 
-    # Containers
-    d = np.zeros(n_simulations)
-    prices = np.zeros(n_simulations)
-    scores = np.zeros(n_simulations)
-    r = np.zeros(n_simulations)
-
-    for i, b in enumerate(batch_backup.backups):
-
-        # Compute the mean distance between the two firms
-        data = np.absolute(
-            b.positions[:, 0] -
-            b.positions[:, 1]) / n_positions
-
-        d[i] = np.mean(data)
-
-        # Compute the mean price
-        prices[i] = np.mean(b.prices[:, :])
-
-        # Compute the mean profit
-        scores[i] = np.mean(b.profits[:, :])
-
-        r[i] = b.parameters.r
+    d, prices, scores = metrics["distance"], metrics["price"], metrics["profit"]
 
     # ---------- Plot ----------------------------- #
 
@@ -87,5 +65,7 @@ def plot(batch_backup, fig_name=None, subplot_spec=None):
 
         plt.tight_layout()
 
-        os.makedirs()
+        os.makedirs(os.path.dirname(fig_name), exist_ok=True)
         plt.savefig(fig_name)
+
+        plt.close()
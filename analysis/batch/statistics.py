@@ -0,0 +1,215 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import itertools
+import os
+import numpy as np
+
+import backup
+
+
+METRICS = "distance", "price", "profit"
+
+# Maximal number of elements of the arrays of resampled indexes (resamples are drawn by blocks under this size)
+MAX_BLOCK_SIZE = 10**7
+
+
+def batch_metrics(batch_backup):
+
+    """
+    Metrics of each run of a batch, computed over the whole simulation
+    :param batch_backup: Batch of runs (pool backup)
+    :return: Radius of each run and value of each metric for each run (np.array, dictionary of np.array)
+    """
+
+    n_simulations = len(batch_backup.backups)
+
+    r = np.zeros(n_simulations)
+    metrics = {k: np.zeros(n_simulations) for k in METRICS}
+
+    for i, b in enumerate(batch_backup.backups):
+
+        summary = backup.summarize(b, span_ratio=1)
+
+        for k in METRICS:
+            metrics[k][i] = summary[k]
+
+        r[i] = b.parameters.r
+
+    return r, metrics
+
+
+def _blocks(n_resamples, n):
+
+    # Sizes of the blocks of resamples, so that a block never has more than 'MAX_BLOCK_SIZE' elements
+    step = max(MAX_BLOCK_SIZE // max(n, 1), 1)
+    return [min(step, n_resamples - start) for start in range(0, n_resamples, step)]
+
+
+def bootstrap_means(x, n_boot=10000, rng=np.random):
+
+    """
+    Means of bootstrap resamples of 'x', all resamples being drawn and averaged as one array operation
+    :param x: Observations (np.array)
+    :param n_boot: Number of resamples (int)
+    :param rng: Random number generator (np.random.RandomState)
+    :return: Mean of each resample (np.array)
+    """
+
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+
+    return np.concatenate([x[rng.randint(low=0, high=n, size=(size, n))].mean(axis=1)
+                           for size in _blocks(n_boot, n)])
+
+
+def difference_ci(x, y, n_boot=10000, level=0.95, rng=np.random):
+
+    """
+    Percentile bootstrap confidence interval of the difference of means 'x' - 'y' (samples resampled independently)
+    :param x: First sample (np.array)
+    :param y: Second sample (np.array)
+    :param n_boot: Number of resamples (int)
+    :param level: Confidence level (float)
+    :param rng: Random number generator (np.random.RandomState)
+    :return: Lower and upper bounds (tuple of float)
+    """
+
+    diff = bootstrap_means(x, n_boot=n_boot, rng=rng) - bootstrap_means(y, n_boot=n_boot, rng=rng)
+    low, high = np.percentile(diff, [100 * (1 - level) / 2, 100 * (1 + level) / 2])
+    return low, high
+
+
+def permutation_test(x, y, n_perm=10000, rng=np.random):
+
+    """
+    Two-sided permutation test of the difference of means between 'x' and 'y'.
+    Each permutation is obtained by partitioning random keys, all permutations of a block at once.
+    :param x: First sample (np.array)
+    :param y: Second sample (np.array)
+    :param n_perm: Number of permutations (int)
+    :param rng: Random number generator (np.random.RandomState)
+    :return: p-value (float)
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    n_x, n = len(x), len(x) + len(y)
+
+    pooled = np.concatenate((x, y))
+    total = np.sum(pooled)
+
+    observed = np.absolute(np.mean(x) - np.mean(y))
+
+    n_extreme = 0
+
+    for size in _blocks(n_perm, n):
+
+        # The first 'n_x' elements of each row are the ones attributed to 'x'
+        idx = np.argpartition(rng.random_sample((size, n)), n_x - 1, axis=1)[:, :n_x]
+        sum_x = pooled[idx].sum(axis=1)
+        diff = np.absolute(sum_x / n_x - (total - sum_x) / (n - n_x))
+
+        # Tolerance for differences equal to the observed one up to rounding errors
+        n_extreme += np.sum(diff >= observed - 1e-12 * max(1., observed))
+
+    return (n_extreme + 1) / (n_perm + 1)
+
+
+def compare(samples, n_boot=10000, level=0.95, seed=None):
+
+    """
+    Compare each couple of groups for each metric: difference of means, its bootstrap confidence interval
+    and the p-value of a permutation test
+    :param samples: Metrics of each group (dictionary: group name -> dictionary: metric -> np.array)
+    :param n_boot: Number of resamples and of permutations (int)
+    :param level: Confidence level (float)
+    :param seed: Seed of the random number generator (int)
+    :return: One row by couple of groups and metric (list of dictionaries)
+    """
+
+    rng = np.random.RandomState(seed)
+
+    rows = []
+
+    for a, b in itertools.combinations(sorted(samples), 2):
+
+        for k in METRICS:
+
+            x, y = samples[a][k], samples[b][k]
+            if not len(x) or not len(y):
+                continue
+
+            low, high = difference_ci(x, y, n_boot=n_boot, level=level, rng=rng)
+
+            rows.append({
+                "metric": k, "group_a": a, "group_b": b, "n_a": len(x), "n_b": len(y),
+                "difference": np.mean(x) - np.mean(y), "ci_low": low, "ci_high": high,
+                "p_value": permutation_test(x, y, n_perm=n_boot, rng=rng)
+            })
+
+    return rows
+
+
+def batch_statistics(batch_backups, file_name=None, n_boot=10000, level=0.95, seed=0):
+
+    """
+    Compare the batches of several move rules: runs are grouped by move rule and by value of 'r'
+    (e.g. 'max_profit r=0.25'), then every couple of groups is compared
+    :param batch_backups: Batches of runs (dictionary: move rule -> pool backup)
+    :param file_name: (Optional) Path of the CSV file where the results are exported (string)
+    :param n_boot: Number of resamples and of permutations (int)
+    :param level: Confidence level (float)
+    :param seed: Seed of the random number generator (int)
+    :return: One row by couple of groups and metric (list of dictionaries)
+    """
+
+    samples = {}
+
+    for move, batch_backup in batch_backups.items():
+
+        r, metrics = batch_metrics(batch_backup)
+
+        for r_value in np.unique(r):
+            samples["{} r={:.2f}".format(move, r_value)] = {k: v[r == r_value] for k, v in metrics.items()}
+
+    rows = compare(samples, n_boot=n_boot, level=level, seed=seed)
+
+    if file_name:
+        export(rows, file_name)
+
+    return rows
+
+
+def export(rows, file_name):
+
+    """
+    Write the results of comparisons in a CSV file
+    :param rows: Results (list of dictionaries)
+    :param file_name: Path of the file (string)
+    :return: None
+    """
+
+    # Create directories if not already existing
+    os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+
+    fields = "metric", "group_a", "group_b", "n_a", "n_b", "difference", "ci_low", "ci_high", "p_value"
+
+    with open(file_name, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,82 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import matplotlib.colors
+
+
+def histogram2d(x, y, bins, extent, chunk_size=10**6):
+
+    """
+    Count the points falling in each cell of a regular grid (points outside of the grid are ignored).
+    Points are binned by chunks, so that memory-mapped arrays are never loaded entirely.
+    :param x: Abscissa of the points (1D array-like)
+    :param y: Ordinate of the points (1D array-like)
+    :param bins: Number of cells along x and y (tuple of int)
+    :param extent: Limits of the grid (x_min, x_max, y_min, y_max)
+    :param chunk_size: Number of points binned at once (int)
+    :return: Counts (np.array of shape 'bins')
+    """
+
+    n_x, n_y = bins
+    x_min, x_max, y_min, y_max = extent
+
+    counts = np.zeros(n_x * n_y, dtype=np.int64)
+
+    for start in range(0, len(x), chunk_size):
+
+        x_chunk = np.asarray(x[start:start + chunk_size], dtype=float)
+        y_chunk = np.asarray(y[start:start + chunk_size], dtype=float)
+
+        i = np.floor((x_chunk - x_min) / (x_max - x_min) * n_x).astype(int)
+        j = np.floor((y_chunk - y_min) / (y_max - y_min) * n_y).astype(int)
+
+        # Points lying on the upper limits belong to the last cell
+        i[x_chunk == x_max] = n_x - 1
+        j[y_chunk == y_max] = n_y - 1
+
+        inside = (i >= 0) * (i < n_x) * (j >= 0) * (j < n_y)
+
+        counts += np.bincount(i[inside] * n_y + j[inside], minlength=n_x * n_y)
+
+    return counts.reshape(n_x, n_y)
+
+
+def density(ax, x, y, bins, extent, cmap="Greys", log=True, zorder=0):
+
+    """
+    Draw the density of a cloud of points as a single image layer,
+    so that the size of the figure and the time needed to render it do not depend on the number of points
+    :param ax: Axes (matplotlib object)
+    :param x: Abscissa of the points (1D array-like)
+    :param y: Ordinate of the points (1D array-like)
+    :param bins: Number of cells along x and y (tuple of int)
+    :param extent: Limits of the grid (x_min, x_max, y_min, y_max)
+    :param cmap: Color map (string)
+    :param log: If True, counts are represented on a logarithmic scale (bool)
+    :param zorder: Order of the layer (int)
+    :return: Image (matplotlib object)
+    """
+
+    counts = histogram2d(x=x, y=y, bins=bins, extent=extent)
+
+    # Empty cells stay blank
+    counts = np.ma.masked_equal(counts, 0)
+
+    norm = matplotlib.colors.LogNorm() if log and counts.count() else None
+
+    return ax.imshow(
+        counts.T, origin="lower", extent=extent, aspect="auto", interpolation="nearest",
+        cmap=cmap, norm=norm, zorder=zorder)
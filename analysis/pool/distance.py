@@ -16,8 +16,11 @@
 from pylab import plt, np
 import os
 
+import backup
+from analysis import density as _density_layer
 
-def distance(pool_backup, fig_name=None, ax=None):
+
+def distance(pool_backup, fig_name=None, ax=None, density=False):
 
     # Shortcuts
     parameters = pool_backup.parameters
@@ -25,8 +28,6 @@ def distance(pool_backup, fig_name=None, ax=None):
 
     # Look at the parameters
     n_simulations = len(parameters["seed"])
-    n_positions = parameters["n_positions"]
-    t_max = parameters["t_max"]
 
     # Containers
     x = np.zeros(n_simulations)
@@ -34,28 +35,17 @@ def distance(pool_backup, fig_name=None, ax=None):
     z = np.zeros(n_simulations)
     y_err = np.zeros(n_simulations)
 
-    # How many time steps from the end of the simulation are included in analysis
-    span_ratio = 0.33  # Take last third
-    span = int(span_ratio * t_max)
-
     for i, b in enumerate(backups):
 
         x[i] = b.parameters.r
 
-        # Compute the mean distance between the two firms
-        data = np.absolute(
-            b.positions[-span:, 0] -
-            b.positions[-span:, 1]) / n_positions
-
-        spacing = np.mean(data)
-
-        y[i] = spacing
+        # Mean distance between the two firms, its std and mean profits on the last third of the simulation
+        # (already computed if the run has been reduced by the worker)
+        metrics = backup.summarize(b)
 
-        # Get std
-        y_err[i] = np.std(data)
-
-        # Get mean profits
-        z[i] = np.mean(b.profits[-span:, :])
+        y[i] = metrics["distance"]
+        y_err[i] = metrics["distance_std"]
+        z[i] = metrics["profit"]
 
     # Plot this
     if ax is None:
@@ -86,7 +76,10 @@ def distance(pool_backup, fig_name=None, ax=None):
     # if color:
     #     _color(fig=fig, ax=ax, x=x, y=y, z=z)
     # else:
-    _bw(ax=ax, x=x, y=y, y_err=y_err)
+    if density:
+        _density(ax=ax, x=x, y=y)
+    else:
+        _bw(ax=ax, x=x, y=y, y_err=y_err)
 
     if fig_name:
         # Cut the margins
@@ -109,6 +102,12 @@ def _bw(ax, x, y, y_err):
     ax.errorbar(x, y, yerr=y_err, fmt='.', color="0.80", zorder=-10, linewidth=0.5)
 
 
+def _density(ax, x, y, bins=(100, 100)):
+
+    # One image for the whole pool, whatever its number of runs
+    _density_layer.density(ax=ax, x=x, y=y, bins=bins, extent=(0, 1, 0, 1))
+
+
 # def _color(fig, ax, x, y, z):
 #
 #     # Do the scatter plot
@@ -6,7 +6,7 @@ from . distance import distance
 from . prices_and_profits import prices_and_profits
 
 
-def distance_price_and_profit(pool_backup, fig_name=None, subplot_spec=None):
+def distance_price_and_profit(pool_backup, fig_name=None, subplot_spec=None, density=False):
 
     nrows, ncols = 1, 2
 
@@ -25,7 +25,7 @@ def distance_price_and_profit(pool_backup, fig_name=None, subplot_spec=None):
     ax_price = plt.subplot(gs2[0, 0])
     ax_profit = plt.subplot(gs2[1, 0])
 
-    distance(pool_backup=pool_backup, ax=ax_distance)
+    distance(pool_backup=pool_backup, ax=ax_distance, density=density)
     prices_and_profits(pool_backup=pool_backup, ax_price=ax_price, ax_profit=ax_profit)
 
     if fig_name:
@@ -15,6 +15,8 @@
 from pylab import plt, np
 import os
 
+import backup
+
 
 def prices_over_fov(pool_backup, ax):
 
@@ -22,19 +24,12 @@ def prices_over_fov(pool_backup, ax):
     parameters = pool_backup.parameters
     backups = pool_backup.backups
 
-    # Look at the parameters
-    t_max = parameters["t_max"]
-
     # Number of bins for the barplot
     n_bins = 50
 
     # Compute the boundaries
     boundaries = np.linspace(0, 1, (n_bins + 1))
 
-    # How many time steps from the end of the simulation are included in analysis
-    span_ratio = 0.33  # Take last third
-    span = int(span_ratio * t_max)
-
     # Container for data
     data = [[] for i in range(n_bins)]
 
@@ -44,7 +39,7 @@ def prices_over_fov(pool_backup, ax):
 
         for i, bound in enumerate(boundaries[1:]):
             if r <= bound:
-                d = np.mean(b.prices[-span:, :])
+                d = backup.summarize(b)["price"]  # Mean on the last third of the simulation
                 data[i].append(d)
                 break
 
@@ -73,16 +68,8 @@ def prices_over_fov(pool_backup, ax):
 def profits_over_fov(pool_backup, ax):
 
     # Shortcuts
-    parameters = pool_backup.parameters
     backups = pool_backup.backups
 
-    # Look at the parameters
-    t_max = parameters["t_max"]
-
-    # How many time steps from the end of the simulation are included in analysis
-    span_ratio = 0.33  # Take last third
-    span = int(span_ratio * t_max)
-
     # Number of bins for the barplot
     n_bins = 50
 
@@ -98,7 +85,7 @@ def profits_over_fov(pool_backup, ax):
 
         for i, bound in enumerate(boundaries[1:]):
             if r <= bound:
-                mean_profit = np.mean(b.profits[-span:, :])
+                mean_profit = backup.summarize(b)["profit"]  # Mean on the last third of the simulation
                 data[i].append(mean_profit)
                 break
 
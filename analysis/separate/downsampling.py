@@ -0,0 +1,98 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+def min_max(y, n_points):
+
+    """
+    Select at most about 'n_points' indexes of a series so that its extrema are preserved:
+    the series is cut in buckets and, in each bucket, the indexes of the minimum and of the maximum are kept.
+    Buckets are strided views on 'y', so it works on memory-mapped arrays without loading them.
+    :param y: Series (1D array-like, e.g. a column of a np.memmap)
+    :param n_points: Number of points wanted (int)
+    :return: Sorted indexes of the points kept (np.array)
+    """
+
+    n = len(y)
+
+    if n <= n_points:
+        return np.arange(n)
+
+    # Views on memory-mapped arrays stay views; other array-likes (e.g. encoded trajectories) are expanded
+    y = np.asarray(y)
+
+    n_buckets = max(n_points // 2, 1)
+    size = int(np.ceil(n / n_buckets))
+    n_full = n // size
+
+    buckets = y[:n_full * size].reshape(n_full, size)
+    start = np.arange(n_full) * size
+
+    idx = [start + np.argmin(buckets, axis=1), start + np.argmax(buckets, axis=1), [0, n - 1]]
+
+    if n_full * size < n:
+        rest = y[n_full * size:]
+        idx.append([n_full * size + np.argmin(rest), n_full * size + np.argmax(rest)])
+
+    return np.unique(np.concatenate(idx))
+
+
+def lttb(x, y, n_points):
+
+    """
+    Largest-Triangle-Three-Buckets: select 'n_points' points of a series that keep its visual shape,
+    choosing in each bucket the point forming the largest triangle with the point selected in the previous bucket
+    and the mean of the next bucket.
+    :param x: Abscissa (1D array-like)
+    :param y: Series (1D array-like)
+    :param n_points: Number of points wanted (int, >= 3)
+    :return: Sorted indexes of the points kept (np.array)
+    """
+
+    n = len(y)
+
+    if n <= n_points or n_points < 3:
+        return np.arange(n)
+
+    # As in 'min_max', other array-likes than arrays are expanded
+    y = np.asarray(y)
+
+    # Bucket boundaries for the points between the first and the last one
+    bounds = np.linspace(1, n - 1, n_points - 1).astype(int)
+
+    idx = np.zeros(n_points, dtype=int)
+    idx[-1] = n - 1
+
+    for i in range(n_points - 2):
+
+        low, high = bounds[i], bounds[i + 1]
+
+        if i + 2 < len(bounds):
+            next_low, next_high = bounds[i + 1], bounds[i + 2]
+            x_next, y_next = np.mean(x[next_low:next_high]), np.mean(y[next_low:next_high])
+        else:
+            x_next, y_next = x[n - 1], y[n - 1]
+
+        x_prev, y_prev = x[idx[i]], y[idx[i]]
+
+        area = np.absolute(
+            (x_prev - x_next) * (np.asarray(y[low:high]) - y_prev) -
+            (x_prev - np.asarray(x[low:high])) * (y_next - y_prev))
+
+        idx[i + 1] = low + np.argmax(area)
+
+    return idx
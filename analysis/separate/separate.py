@@ -18,22 +18,39 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import os
 
+import backup as _backup
+from analysis import density as _density_layer
+from . import downsampling
 
-def eeg_like(backup, subplots_positions):
+
+def eeg_like(backup, subplots_positions, max_points=2000, downsample="min_max"):
+
+    assert downsample in ("min_max", "lttb"), "'downsample' have to be 'min_max' or 'lttb'."
 
     pst = backup.positions
     prc = backup.prices
 
     t_max = backup.parameters.t_max
 
-    t = np.arange(1, t_max)
-
     position_max = backup.parameters.n_positions - 1
 
-    position_A = pst[1:t_max, 0] / position_max
-    position_B = pst[1:t_max, 1] / position_max
-    price_A = prc[1:t_max, 0]
-    price_B = prc[1:t_max, 1]
+    # For long runs, only plot about 'max_points' points by curve, keeping minima and maxima ('min_max')
+    # or the visual shape of the curve ('lttb')
+    # (selection is done on views, so that memory-mapped trajectories are not loaded entirely)
+    curves = []
+    for y in (pst[1:t_max, 0], pst[1:t_max, 1], prc[1:t_max, 0], prc[1:t_max, 1]):
+        if downsample == "lttb":
+            idx = downsampling.lttb(np.arange(len(y)), y, n_points=max_points)
+        else:
+            idx = downsampling.min_max(y, n_points=max_points)
+        curves.append((idx + 1, np.asarray(y[idx])))
+
+    (t_A, position_A), (t_B, position_B), (t_price_A, price_A), (t_price_B, price_B) = curves
+
+    position_A = position_A / position_max
+    position_B = position_B / position_max
+
+    t = np.array([1, t_max - 1])  # For horizontal lines
 
     color_A = "orange"
     color_B = "blue"
@@ -43,7 +60,7 @@ def eeg_like(backup, subplots_positions):
 
     # Position firm A
     ax = plt.subplot(subplots_positions[0])
-    ax.plot(t, position_A, color=color_A, alpha=1, linewidth=1.1)
+    ax.plot(t_A, position_A, color=color_A, alpha=1, linewidth=1.1)
     ax.plot(t, np.ones(len(t)) * 0.5, color='0.5', linewidth=0.5, linestyle='dashed', zorder=-10)
     ax.spines['top'].set_color('none')
     ax.spines['right'].set_color('none')
@@ -61,7 +78,7 @@ def eeg_like(backup, subplots_positions):
 
     # Position firm B
     ax = plt.subplot(subplots_positions[1])
-    ax.plot(t, position_B, color=color_B, alpha=1, linewidth=1.1)
+    ax.plot(t_B, position_B, color=color_B, alpha=1, linewidth=1.1)
     ax.plot(t, np.ones(len(t)) * 0.5, color='0.5', linewidth=0.5, linestyle='dashed', zorder=-10)
     ax.spines['top'].set_color('none')
     ax.spines['right'].set_color('none')
@@ -76,7 +93,7 @@ def eeg_like(backup, subplots_positions):
 
     # Price firm A
     ax = plt.subplot(subplots_positions[2])
-    ax.plot(t, price_A, color=color_A, alpha=1, linewidth=1.1, clip_on=False)
+    ax.plot(t_price_A, price_A, color=color_A, alpha=1, linewidth=1.1, clip_on=False)
     ax.spines['top'].set_color('none')
     ax.spines['right'].set_color('none')
     ax.spines['bottom'].set_color('none')
@@ -91,7 +108,7 @@ def eeg_like(backup, subplots_positions):
 
     # Price firm B
     ax = plt.subplot(subplots_positions[3])
-    ax.plot(t, price_B, color=color_B, alpha=1, linewidth=1.1, clip_on=False)
+    ax.plot(t_price_B, price_B, color=color_B, alpha=1, linewidth=1.1, clip_on=False)
     ax.spines['top'].set_color('none')
     ax.spines['right'].set_color('none')
     ax.spines['bottom'].set_color('none')
@@ -107,15 +124,28 @@ def eeg_like(backup, subplots_positions):
         tick.set_fontsize("small")
 
 
-def pos_firmA_over_pos_firmB(backup, subplot_position):
+def pos_firmA_over_pos_firmB(backup, subplot_position, density=False):
 
     position_max = backup.parameters.n_positions - 1
 
-    pos = backup.positions[-1000:] / position_max
-
     ax = plt.subplot(subplot_position)
 
-    ax.scatter(pos[:, 0], pos[:, 1], color="black", alpha=0.05, zorder=10)
+    if density:
+
+        # Density of the positions over the last part of the run, one cell by couple of positions
+        span = int(backup.parameters.t_max * _backup.SPAN_RATIO)
+        pos = backup.positions[-span:] / position_max
+
+        half_cell = 0.5 / position_max
+        _density_layer.density(
+            ax=ax, x=pos[:, 0], y=pos[:, 1], bins=(position_max + 1, position_max + 1),
+            extent=(-half_cell, 1 + half_cell, -half_cell, 1 + half_cell), zorder=10)
+
+    else:
+
+        pos = backup.positions[-1000:] / position_max
+        ax.scatter(pos[:, 0], pos[:, 1], color="black", alpha=0.05, zorder=10)
+
     ax.axvline(0.5, color="0.5", linewidth=0.5, linestyle="--", zorder=1)
     ax.axhline(0.5, color="0.5", linewidth=0.5, linestyle="--", zorder=1)
 
@@ -138,7 +168,7 @@ def pos_firmA_over_pos_firmB(backup, subplot_position):
     return ax
 
 
-def separate(backups, fig_name=None, subplot_spec=None):
+def separate(backups, fig_name=None, subplot_spec=None, max_points=2000, density=False, downsample="min_max"):
 
     # Width ratios of the two columns (we expect the right column to be twice larger than the left one)
     width_ratios = [0.8, 1]
@@ -168,14 +198,14 @@ def separate(backups, fig_name=None, subplot_spec=None):
     for i, b in zip(range(n_rows), backups):
 
         # Plot the sub-figure on left
-        ax = pos_firmA_over_pos_firmB(b, subplot_position=gs0[i, 0])
+        ax = pos_firmA_over_pos_firmB(b, subplot_position=gs0[i, 0], density=density)
 
         # Create sub-rows on the right
         gs = gridspec.GridSpecFromSubplotSpec(n_right_sub_row, 1, subplot_spec=gs0[i, 1])
         subplots_positions = [gs[j, 0] for j in range(n_right_sub_row)]
 
         # Plot the 4 sub-figures on the right
-        eeg_like(backup=b, subplots_positions=subplots_positions)
+        eeg_like(backup=b, subplots_positions=subplots_positions, max_points=max_points, downsample=downsample)
 
         title = '$r$ = {:.2f}'.format(b.parameters.r)
         ax.set_title(title)
@@ -1 +1,6 @@
 from . backup import *
+from . summary import *
+from . buffers import TrajectoryBuffer, MappedPoolBackup, write_runs
+from . replay import ReplayBackup, compact
+from . catalog import Catalog
+from . cyclic import CyclicArray, encode, encode_run
@@ -14,9 +14,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pickle
+import struct
 import json
 import os
 
+import numpy as np
+
 
 class Backup:
 
@@ -49,10 +52,19 @@ class Backup:
         with open(pickle_file_name, "rb") as f:
             return pickle.load(f)
 
+    def stored(self):
+
+        """
+        What is written for this run in an indexed pool file (see 'PoolWriter')
+        :return: Backup
+        """
+
+        return self
+
 
 class RunBackup(Backup):
 
-    def __init__(self, parameters, positions, prices, profits, n_consumers):
+    def __init__(self, parameters, positions, prices, profits, n_consumers, initial_move=None, tie_breaks=None):
         super().__init__(parameters)
 
         self.positions = positions
@@ -60,6 +72,10 @@ class RunBackup(Backup):
         self.profits = profits
         self.n_consumers = n_consumers
 
+        # (Optional) Enough to replay the run (see 'replay.ReplayBackup')
+        self.initial_move = initial_move
+        self.tie_breaks = tie_breaks
+
 
 class PoolBackup(Backup):
 
@@ -67,3 +83,222 @@ class PoolBackup(Backup):
         super().__init__(parameters)
 
         self.backups = backups
+
+
+class PoolWriter:
+
+    """
+    Write the runs of a pool one by one in a single file, followed by an index
+    (offset, r and seed of each run) that allows to read back any run without unpickling the others.
+    """
+
+    magic = b"SCPOOL1\n"
+
+    def __init__(self, parameters, data_file, catalog=None):
+
+        """
+        :param parameters: Parameters of the pool (dictionary)
+        :param data_file: Path to the data file (string)
+        :param catalog: (Optional) Catalog indexing each run as it is written ('Catalog' object)
+        """
+
+        os.makedirs(os.path.dirname(data_file), exist_ok=True)
+
+        self.parameters = parameters
+        self.data_file = data_file
+
+        self.catalog = catalog
+        if catalog is not None:
+            catalog.forget(data_file)
+
+        self.offsets = []
+        self.r = []
+        self.seed = []
+
+        self.f = open(data_file, "wb")
+        self.f.write(self.magic)
+        self.f.write(struct.pack("<Q", 0))  # Placeholder for the offset of the index
+
+    def write(self, run_backup):
+
+        self.offsets.append(self.f.tell())
+        self.r.append(run_backup.parameters.r)
+        self.seed.append(run_backup.parameters.seed)
+
+        pickle.dump(run_backup.stored(), self.f)
+
+        if self.catalog is not None:
+            self.catalog.add(self.data_file, len(self.offsets) - 1, run_backup)
+
+            if len(self.offsets) % 100 == 0:
+                self.catalog.commit()
+
+    def close(self):
+
+        index_offset = self.f.tell()
+
+        pickle.dump({
+            "parameters": self.parameters,
+            "offsets": self.offsets,
+            "r": self.r,
+            "seed": self.seed
+        }, self.f)
+
+        self.f.seek(len(self.magic))
+        self.f.write(struct.pack("<Q", index_offset))
+        self.f.close()
+
+        if self.catalog is not None:
+            self.catalog.commit()
+
+    def abort(self):
+
+        """
+        Delete the partial file (and its runs from the catalog), so that it is never taken for a complete pool
+        :return: None
+        """
+
+        self.f.close()
+        os.remove(self.data_file)
+
+        if self.catalog is not None:
+            self.catalog.forget(self.data_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+
+        # The index is only written when every run was written
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class IndexedPoolBackup:
+
+    """
+    Read-only access to a pool written by a 'PoolWriter'.
+    Only the index is loaded at opening; a run is unpickled when it is accessed.
+    """
+
+    def __init__(self, data_file):
+
+        self.data_file = data_file
+
+        with open(data_file, "rb") as f:
+            assert f.read(len(PoolWriter.magic)) == PoolWriter.magic, \
+                "'{}' is not an indexed pool file.".format(data_file)
+            index_offset, = struct.unpack("<Q", f.read(8))
+            f.seek(index_offset)
+            index = pickle.load(f)
+
+        self.parameters = index["parameters"]
+        self.offsets = np.asarray(index["offsets"], dtype=np.int64)
+        self.r = np.asarray(index["r"], dtype=float)
+        self.seed = np.asarray(index["seed"], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+
+        with open(self.data_file, "rb") as f:
+            return self._read(f, i)
+
+    def _read(self, f, i):
+
+        f.seek(self.offsets[i])
+        run_backup = pickle.load(f)
+
+        # Runs stored without their parameters get them back from the index (see 'Backup.stored')
+        if run_backup.parameters is None:
+            run_backup.parameters = self.run_parameters(i)
+
+        return run_backup
+
+    def run_parameters(self, i):
+
+        """
+        Parameters of a run, given the parameters of the pool and the radius and seed of the run in the index
+        :param i: Index of the run (int)
+        :return: 'Parameters' object
+        """
+
+        from parameters import extract_parameters
+        return extract_parameters(dict(self.parameters, r=float(self.r[i]), seed=int(self.seed[i])))
+
+    def select(self, r_min=None, r_max=None, where=None):
+
+        """
+        Select runs given their parameters.
+        :param r_min: (Optional) Runs with a radius strictly superior to 'r_min' (float)
+        :param r_max: (Optional) Runs with a radius strictly inferior to 'r_max' (float)
+        :param where: (Optional) Function of 'r' and 'seed' returning True for the runs to keep (callable)
+        :return: Indexes of the selected runs (np.array)
+        """
+
+        keep = np.ones(len(self), dtype=bool)
+
+        if r_min is not None:
+            keep &= self.r > r_min
+
+        if r_max is not None:
+            keep &= self.r < r_max
+
+        if where is not None:
+            keep &= np.array([bool(where(r, seed)) for r, seed in zip(self.r, self.seed)], dtype=bool)
+
+        return np.flatnonzero(keep)
+
+    def iter_runs(self, r_min=None, r_max=None, where=None):
+
+        """
+        Yield runs one by one (in the order of the file), optionally filtered (see 'select').
+        :return: Generator of run backups
+        """
+
+        with open(self.data_file, "rb") as f:
+            for i in self.select(r_min=r_min, r_max=r_max, where=where):
+                yield self._read(f, i)
+
+    @property
+    def backups(self):
+        return LazyBackups(self)
+
+
+class LazyBackups:
+
+    """
+    Sequence view over the runs of an indexed pool, so that it can be used in place of 'PoolBackup.backups'.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __len__(self):
+        return len(self.pool)
+
+    def __getitem__(self, i):
+        return self.pool[i]
+
+    def __iter__(self):
+        return self.pool.iter_runs()
+
+
+def load_pool(data_file):
+
+    """
+    Load a pool, whatever the format used for saving it.
+    :param data_file: Path to the data file (string)
+    :return: 'IndexedPoolBackup' for indexed files, 'PoolBackup' otherwise
+    """
+
+    with open(data_file, "rb") as f:
+        is_indexed = f.read(len(PoolWriter.magic)) == PoolWriter.magic
+
+    if is_indexed:
+        return IndexedPoolBackup(data_file)
+
+    return Backup.load(data_file)
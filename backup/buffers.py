@@ -0,0 +1,146 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import numpy as np
+
+from . backup import Backup, RunBackup
+
+
+class TrajectoryBuffer:
+
+    """
+    Memory-mapped arrays (one '.npy' file by record) holding the trajectories of all the runs of a pool,
+    run 'i' being stored at index 'i' whatever the worker that produced it and the moment it finished.
+    """
+
+    records = {
+        "positions": np.int64,
+        "prices": np.float64,
+        "n_consumers": np.float64,
+        "profits": np.float64
+    }
+
+    def __init__(self, directory, n_runs=None, t_max=None, mode="r"):
+
+        """
+        :param directory: Directory of the '.npy' files (string)
+        :param n_runs: Number of runs (only for creation) (int)
+        :param t_max: Number of time steps of each run (only for creation) (int)
+        :param mode: 'w+' for creating the files, 'r+' for writing in existing files, 'r' for reading (string)
+        """
+
+        self.directory = directory
+        self.mode = mode
+
+        if mode == "w+":
+            os.makedirs(directory, exist_ok=True)
+
+        self.arrays = {
+            k: np.lib.format.open_memmap(
+                os.path.join(directory, "{}.npy".format(k)), mode=mode, dtype=dtype,
+                shape=(n_runs, t_max, 2) if mode == "w+" else None)
+            for k, dtype in self.records.items()
+        }
+
+    def __len__(self):
+        return len(self.arrays["positions"])
+
+    def write(self, i, run_backup):
+
+        for k, array in self.arrays.items():
+            array[i] = getattr(run_backup, k)
+
+    def flush(self):
+
+        for array in self.arrays.values():
+            array.flush()
+
+
+# Buffers opened by a worker, kept open for the next runs it writes
+_opened = {}
+
+
+def write_runs(tasks, directory, run):
+
+    """
+    Executed by a worker: run simulations and write their trajectories in the buffer at their index.
+    :param tasks: Index and parameters of each run (list of tuples)
+    :param directory: Directory of the buffer (string)
+    :param run: Function running simulations given a list of 'Parameters' objects, runs carrying their metrics
+    (see 'main.run_batch') (callable)
+    :return: Index and metrics of each run written, for indexing it without reading its trajectories
+    (list of tuples)
+    """
+
+    if directory not in _opened:
+        _opened[directory] = TrajectoryBuffer(directory, mode="r+")
+
+    buffer = _opened[directory]
+
+    written = []
+
+    for (i, _), bkp in zip(tasks, run([param for _, param in tasks])):
+        buffer.write(i, bkp)
+        written.append((i, bkp.metrics))
+
+    buffer.flush()
+
+    return written
+
+
+class MappedPoolBackup(Backup):
+
+    """
+    Pool whose trajectories live in a 'TrajectoryBuffer'.
+    Only the parameters are pickled; runs are views on the memory-mapped arrays (nothing is copied).
+    """
+
+    def __init__(self, parameters, run_parameters, directory):
+
+        """
+        :param parameters: Parameters of the pool (dictionary)
+        :param run_parameters: Parameters of each run, in the order of the buffer (list of 'Parameters' objects)
+        :param directory: Directory of the buffer (string)
+        """
+
+        super().__init__(parameters)
+
+        self.run_parameters = run_parameters
+        self.directory = directory
+
+        self.buffer = TrajectoryBuffer(directory, mode="r")
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        del state["buffer"]
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self.buffer = TrajectoryBuffer(self.directory, mode="r")
+
+    def run(self, i):
+
+        return RunBackup(
+            parameters=self.run_parameters[i],
+            **{k: self.buffer.arrays[k][i] for k in TrajectoryBuffer.records}
+        )
+
+    @property
+    def backups(self):
+        return [self.run(i) for i in range(len(self.run_parameters))]
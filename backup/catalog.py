@@ -0,0 +1,226 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sqlite3
+import time
+
+from . backup import Backup, IndexedPoolBackup, load_pool
+from . summary import SPAN_RATIO, RunSummary, summarize
+
+
+# Parameters indexed for each run (missing ones are stored as NULL)
+PARAMETERS = "move", "opp_move", "r", "seed", "n_positions", "n_prices", "p_min", "p_max", "t_max", \
+    "depth", "alpha", "epsilon", "geometry", "metric", "temperature"
+
+METRICS = "distance", "distance_std", "price", "profit"
+
+COLUMNS = ("data_file", "position") + PARAMETERS + ("span_ratio", ) + METRICS + ("created", )
+
+
+class Catalog:
+
+    """
+    SQLite index of the runs of every sweep: parameters and summary metrics of each run,
+    with the data file holding it and its position in that file.
+    Aggregated slices are answered by the database; trajectories are loaded only for the runs selected.
+    """
+
+    def __init__(self, db_file="data/runs.sqlite"):
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+
+        self.db_file = db_file
+
+        # Several producers (threads or processes) may write at the same time: wait for the lock
+        self.connection = sqlite3.connect(db_file, timeout=60)
+
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs ({}, PRIMARY KEY (data_file, position))".format(", ".join(COLUMNS)))
+        self.connection.execute("CREATE INDEX IF NOT EXISTS runs_move_r ON runs (move, r)")
+
+        # Catalogs created before a parameter was indexed get its column (NULL for the runs already there)
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(runs)")}
+        for k in COLUMNS:
+            if k not in existing:
+                self.connection.execute("ALTER TABLE runs ADD COLUMN {}".format(k))
+
+        self.connection.commit()
+
+        # Rows added since the last commit: they are written in one short transaction, so that the database is
+        # not kept locked for the other producers while runs are computed
+        self.pending = []
+
+    def forget(self, data_file):
+
+        """
+        Remove the runs of a data file (e.g. before it is written again)
+        :param data_file: Path to the data file (string)
+        :return: None
+        """
+
+        self.pending = [row for row in self.pending if row[0] != os.path.abspath(data_file)]
+
+        self.connection.execute("DELETE FROM runs WHERE data_file = ?", (os.path.abspath(data_file), ))
+        self.connection.commit()
+
+    def add(self, data_file, position, run_backup, span_ratio=SPAN_RATIO):
+
+        """
+        Index a run (changes are written at the next 'commit').
+        Metrics are the ones attached to the run by the worker when there are some (see 'main.run')
+        :param data_file: Path to the data file holding the run (string)
+        :param position: Position of the run in the data file (int, None for a file holding a single run)
+        :param run_backup: Backup of the run (any run backup, e.g. 'RunBackup' or 'RunSummary')
+        :param span_ratio: Proportion of the last time steps included in metrics (float)
+        :return: None
+        """
+
+        param = run_backup.parameters
+
+        # A run reduced to a subset of metrics is indexed with NULL for the others
+        if isinstance(run_backup, RunSummary):
+            metrics = summarize(run_backup, span_ratio=span_ratio, metrics=list(run_backup.metrics))
+        else:
+            metrics = summarize(run_backup, span_ratio=span_ratio)
+
+        values = [getattr(param, k, None) for k in PARAMETERS]
+        values = [str(v).replace("Move.", "") if k in ("move", "opp_move") and v is not None else v
+                  for k, v in zip(PARAMETERS, values)]
+
+        self.pending.append(
+            [os.path.abspath(data_file), -1 if position is None else int(position)] + values +
+            [span_ratio] + [metrics.get(k) for k in METRICS] + [time.time()])
+
+    def commit(self):
+
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO runs ({}) VALUES ({})".format(
+                        ", ".join(COLUMNS), ", ".join("?" * len(COLUMNS))),
+                    self.pending)
+            self.pending = []
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def _where(conditions):
+
+        """
+        :param conditions: Column -> value, or (min, max) for an inclusive range (dictionary)
+        :return: SQL 'WHERE' clause and its arguments (string, list)
+        """
+
+        clauses, args = [], []
+
+        for k, v in conditions.items():
+
+            assert k in COLUMNS, "'{}' is not a column of the catalog.".format(k)
+
+            if isinstance(v, tuple):
+                clauses.append("{} BETWEEN ? AND ?".format(k))
+                args += list(v)
+            else:
+                clauses.append("{} = ?".format(k))
+                args.append(v)
+
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def select(self, columns=COLUMNS, **conditions):
+
+        """
+        Select runs, e.g. 'select(move="equal_sharing", r=(0.3, 0.4))'
+        :param columns: Columns returned (iterable of strings)
+        :param conditions: Column -> value, or (min, max) for an inclusive range
+        :return: One dictionary by run (list)
+        """
+
+        for k in columns:
+            assert k in COLUMNS, "'{}' is not a column of the catalog.".format(k)
+
+        where, args = self._where(conditions)
+
+        cursor = self.connection.execute("SELECT {} FROM runs{}".format(", ".join(columns), where), args)
+
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def aggregate(self, metric, group_by=(), **conditions):
+
+        """
+        Number of runs, mean and standard deviation of a metric, e.g. 'aggregate("distance", group_by=("move", ),
+        r=(0.3, 0.4))'
+        :param metric: Name of the metric (string)
+        :param group_by: Columns defining groups (iterable of strings)
+        :param conditions: Column -> value, or (min, max) for an inclusive range
+        :return: One dictionary by group (list)
+        """
+
+        assert metric in METRICS, "'metric' have to be one of {}.".format(METRICS)
+        for k in group_by:
+            assert k in COLUMNS, "'{}' is not a column of the catalog.".format(k)
+
+        where, args = self._where(conditions)
+        groups = ", ".join(group_by)
+
+        cursor = self.connection.execute(
+            "SELECT {groups}{sep}COUNT({m}), AVG({m}), AVG({m} * {m}) FROM runs{where}{group}".format(
+                groups=groups, sep=", " if groups else "", m=metric, where=where,
+                group=" GROUP BY " + groups if groups else ""), args)
+
+        result = []
+
+        for row in cursor:
+
+            n, mean, mean_square = row[len(group_by):]
+            if not n:
+                continue
+
+            entry = dict(zip(group_by, row))
+            entry.update(n=n, mean=mean, std=max(mean_square - mean ** 2, 0) ** 0.5)
+            result.append(entry)
+
+        return result
+
+    @staticmethod
+    def load(row):
+
+        """
+        Load the backup of a selected run
+        :param row: Run as returned by 'select' (it needs at least 'data_file' and 'position') (dictionary)
+        :return: Backup of the run
+        """
+
+        if row["position"] < 0:
+            return Backup.load(row["data_file"])
+
+        pool = load_pool(row["data_file"])
+
+        if isinstance(pool, IndexedPoolBackup):
+            return pool[row["position"]]
+
+        if hasattr(pool, "run"):
+            # Memory-mapped pool: the position is the index of the run
+            return pool.run(row["position"])
+
+        return pool.backups[row["position"]]
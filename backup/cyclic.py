@@ -0,0 +1,340 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import numpy as np
+import numpy.lib.mixins
+
+from . backup import RunBackup
+
+
+# Longest cycle looked for (and longest common cycle of two arrays combined elementwise)
+MAX_CYCLE = 64
+
+
+class CyclicArray(numpy.lib.mixins.NDArrayOperatorsMixin):
+
+    """
+    Trajectory stored as a dense head followed by a cycle repeated until the end of the run
+    (a fixed point is a cycle of length 1). Time is the first axis.
+    Slicing along time, selecting columns and elementwise operations keep the encoding;
+    sums, means, standard deviations, minima and maxima are computed on the head and on the cycle only.
+    Any other use expands it to a dense array ('np.asarray').
+    """
+
+    def __init__(self, head, cycle, length):
+
+        """
+        :param head: Rows before the cycle (np.array)
+        :param cycle: Rows of the cycle, empty if the whole array is in the head (np.array)
+        :param length: Number of rows (int)
+        """
+
+        assert len(cycle) or len(head) == length, "Without cycle, the head has to hold every row."
+
+        self.head = head
+        self.cycle = cycle
+        self.length = length
+
+    @property
+    def shape(self):
+        return (self.length, ) + self.cycle.shape[1:]
+
+    @property
+    def ndim(self):
+        return self.cycle.ndim
+
+    @property
+    def dtype(self):
+        return np.result_type(self.head, self.cycle)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return "CyclicArray(head={}, cycle={}, length={})".format(len(self.head), len(self.cycle), self.length)
+
+    def rows(self, t):
+
+        """
+        :param t: Time steps (np.array of int)
+        :return: Rows at these time steps (np.array)
+        """
+
+        t = np.asarray(t, dtype=int)
+        h, c = len(self.head), len(self.cycle)
+
+        out = np.empty(t.shape + self.shape[1:], dtype=self.dtype)
+
+        in_head = t < h
+        out[in_head] = self.head[t[in_head]]
+        if c:
+            out[~in_head] = self.cycle[(t[~in_head] - h) % c]
+
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+
+        dense = self.rows(np.arange(self.length))
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+    def __getitem__(self, key):
+
+        if isinstance(key, tuple):
+
+            time_key, others = key[0], key[1:]
+            result = self[time_key]
+
+            if not others:
+                return result
+
+            if isinstance(time_key, (int, np.integer)):
+                return result[others]
+
+            columns = (slice(None), ) + others
+
+            if isinstance(result, CyclicArray) and all(isinstance(k, (int, np.integer, slice)) for k in others):
+                return CyclicArray(result.head[columns], result.cycle[columns], result.length)
+
+            return np.asarray(result)[columns]
+
+        if isinstance(key, (int, np.integer)):
+            t = key + self.length if key < 0 else key
+            assert 0 <= t < self.length, "Index {} is out of bounds for length {}.".format(key, self.length)
+            return self.rows([t])[0]
+
+        if isinstance(key, slice):
+
+            start, stop, step = key.indices(self.length)
+
+            if step != 1:
+                return self.rows(np.arange(start, stop, step))
+
+            stop = max(start, stop)
+            h, c = len(self.head), len(self.cycle)
+
+            head = self.head[start:min(stop, h)]
+
+            if stop <= h:
+                return CyclicArray(head, self.cycle[:0], stop - start)
+
+            # The cycle starts at another phase
+            phase = (max(start, h) - h) % c
+            return CyclicArray(head, np.roll(self.cycle, -phase, axis=0), stop - start)
+
+        return np.asarray(self)[key]
+
+    def aligned(self, head_length, cycle_length):
+
+        """
+        Same values with a longer head and a cycle repeated several times (for combining two arrays elementwise).
+        """
+
+        return (self.rows(np.arange(head_length)),
+                self.rows(np.arange(head_length, head_length + cycle_length)))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+
+        cyclic = [x for x in inputs if isinstance(x, CyclicArray)]
+
+        encodable = method == "__call__" and not kwargs.get("out") \
+            and all(x.length == self.length for x in cyclic) \
+            and all(isinstance(x, CyclicArray) or np.ndim(x) == 0 for x in inputs)
+
+        if encodable:
+            h = max(len(x.head) for x in cyclic)
+            c = 1
+            for x in cyclic:
+                c = c * len(x.cycle) // math.gcd(c, len(x.cycle)) if len(x.cycle) else c
+            c = min(c, self.length - h)
+            encodable = c <= MAX_CYCLE
+
+        if not encodable:
+            inputs = [np.asarray(x) if isinstance(x, CyclicArray) else x for x in inputs]
+            return getattr(ufunc, method)(*inputs, **kwargs)
+
+        parts = [x.aligned(h, c) if isinstance(x, CyclicArray) else (x, x) for x in inputs]
+
+        heads = ufunc(*[p[0] for p in parts], **kwargs)
+        cycles = ufunc(*[p[1] for p in parts], **kwargs)
+
+        if isinstance(heads, tuple):
+            return tuple(CyclicArray(a, b, self.length) for a, b in zip(heads, cycles))
+
+        return CyclicArray(heads, cycles, self.length)
+
+    def _over_time(self, func):
+
+        # Combine 'func' of the head, of the full cycles and of the last partial cycle
+        h, c = len(self.head), len(self.cycle)
+        n_cycles, remainder = divmod(self.length - h, c) if c else (0, 0)
+
+        return func(self.head, 1), func(self.cycle, n_cycles), func(self.cycle[:remainder], 1)
+
+    def sum(self, axis=None, dtype=None, out=None, keepdims=False, **kwargs):
+
+        if out is not None or keepdims or kwargs:
+            return np.sum(np.asarray(self), axis=axis, dtype=dtype, out=out, keepdims=keepdims, **kwargs)
+
+        if axis is not None and axis % self.ndim != 0:
+            return CyclicArray(self.head.sum(axis=axis, dtype=dtype), self.cycle.sum(axis=axis, dtype=dtype),
+                               self.length)
+
+        parts = self._over_time(lambda x, w: w * np.sum(x, axis=0, dtype=dtype))
+        total = parts[0] + parts[1] + parts[2]
+
+        return total if axis is not None else np.sum(total, dtype=dtype)
+
+    def mean(self, axis=None, dtype=None, out=None, keepdims=False, **kwargs):
+
+        if out is not None or keepdims or kwargs:
+            return np.mean(np.asarray(self), axis=axis, dtype=dtype, out=out, keepdims=keepdims, **kwargs)
+
+        if axis is not None and axis % self.ndim != 0:
+            return CyclicArray(self.head.mean(axis=axis, dtype=dtype), self.cycle.mean(axis=axis, dtype=dtype),
+                               self.length)
+
+        total = self.sum(axis=axis, dtype=dtype if dtype is not None else float)
+
+        return total / (self.length if axis is not None else self.size)
+
+    def std(self, axis=None, dtype=None, out=None, ddof=0, keepdims=False, **kwargs):
+
+        if out is not None or keepdims or kwargs or (axis is not None and axis % self.ndim != 0):
+            return np.std(np.asarray(self), axis=axis, dtype=dtype, out=out, ddof=ddof, keepdims=keepdims,
+                          **kwargs)
+
+        mean = self.mean(axis=axis, dtype=dtype)
+
+        # Two passes, so that a constant trajectory has exactly no deviation
+        parts = self._over_time(lambda x, w: w * np.sum((x - mean) ** 2, axis=0))
+        total = parts[0] + parts[1] + parts[2]
+
+        n = self.length if axis is not None else self.size
+
+        return np.sqrt((total if axis is not None else np.sum(total)) / (n - ddof))
+
+    def _extremum(self, func, axis, out, keepdims, kwargs):
+
+        if out is not None or keepdims or kwargs:
+            return func(np.asarray(self), axis=axis, out=out, keepdims=keepdims, **kwargs)
+
+        if axis is not None and axis % self.ndim != 0:
+            return CyclicArray(func(self.head, axis=axis), func(self.cycle, axis=axis), self.length)
+
+        # Only the rows present: the array may end before the head, or before the end of the first cycle
+        h = min(len(self.head), self.length)
+        rows = np.concatenate((self.head[:h], self.cycle[:min(len(self.cycle), self.length - h)]))
+
+        values = func(rows, axis=0)
+
+        return values if axis is not None else func(values)
+
+    def min(self, axis=None, out=None, keepdims=False, **kwargs):
+        return self._extremum(np.min, axis, out, keepdims, kwargs)
+
+    def max(self, axis=None, out=None, keepdims=False, **kwargs):
+        return self._extremum(np.max, axis, out, keepdims, kwargs)
+
+
+def encode(x, max_cycle=MAX_CYCLE):
+
+    """
+    Find the shortest encoding of an array as a head followed by a repeated cycle.
+    :param x: Trajectory, time being the first axis (np.array)
+    :param max_cycle: Longest cycle looked for (int)
+    :return: Encoded array ('CyclicArray' object)
+    """
+
+    x = np.asarray(x)
+    n = len(x)
+
+    # By default, everything in the head
+    best_head, best_cycle = n, 0
+
+    for c in range(1, min(max_cycle, n - 1) + 1):
+
+        # Rows from which the array repeats itself with period 'c'
+        same = np.all((x[c:] == x[:-c]).reshape(n - c, -1), axis=1)
+        different = np.flatnonzero(~same)
+        h = different[-1] + 1 if len(different) else 0
+
+        if h + c < best_head + best_cycle:
+            best_head, best_cycle = h, c
+
+    return CyclicArray(x[:best_head].copy(), x[best_head:best_head + best_cycle].copy(), n)
+
+
+def encode_run(run_backup, max_cycle=MAX_CYCLE):
+
+    """
+    Encode the trajectories of a run (usable as a reducer, see 'produce_data' in main).
+    :param run_backup: Backup of a run ('RunBackup' object)
+    :param max_cycle: Longest cycle looked for (int)
+    :return: Backup whose trajectories are 'CyclicArray' objects ('RunBackup' object)
+    """
+
+    return RunBackup(
+        parameters=run_backup.parameters,
+        **{k: encode(getattr(run_backup, k), max_cycle=max_cycle)
+           for k in ("positions", "prices", "profits", "n_consumers")},
+        initial_move=getattr(run_backup, "initial_move", None), tie_breaks=getattr(run_backup, "tie_breaks", None))
+
+
+def check(n_trials=1000, seed=0):
+
+    """
+    Compare the reductions of encoded arrays, and of slices of them, to the ones of the dense arrays
+    (e.g. 'print(backup.cyclic.check())': every count should be 0).
+    :param n_trials: Number of random arrays (int)
+    :param seed: Seed of the random number generator (int)
+    :return: Number of mismatches by reduction (dictionary)
+    """
+
+    rng = np.random.RandomState(seed)
+
+    mismatches = {k: 0 for k in ("sum", "mean", "std", "min", "max")}
+
+    for _ in range(n_trials):
+
+        # Random head followed by a cycle repeated a random number of times (possibly cut)
+        n_columns = rng.randint(1, 3)
+        head = rng.randint(0, 10, size=(rng.randint(0, 6), n_columns))
+        cycle = rng.randint(0, 10, size=(rng.randint(1, 6), n_columns))
+        length = len(head) + rng.randint(1, 20)
+
+        dense = np.concatenate((head, np.tile(cycle, (length // len(cycle) + 1, 1))))[:length]
+        encoded = encode(dense)
+
+        # Non-empty slice, bounds given from the start or from the end
+        start = rng.randint(0, length)
+        stop = rng.randint(start + 1, length + 1)
+        if rng.rand() < 0.5:
+            start, stop = start - length, (stop - length) or None
+
+        for k in mismatches:
+            for axis in (None, 0):
+                expected = getattr(np, k)(dense[start:stop], axis=axis)
+                obtained = getattr(np, k)(encoded[start:stop], axis=axis)
+                mismatches[k] += not np.allclose(expected, obtained)
+
+    return mismatches
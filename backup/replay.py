@@ -0,0 +1,108 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+from . backup import Backup, RunBackup
+
+
+class ReplayBackup(Backup):
+
+    """
+    Compact backup of a run: only what is needed to replay it (move of firm 1 before the first step
+    and rank of the move chosen in each tie set, nothing when there was no tie).
+    Trajectories are regenerated the first time an analysis accesses them, and are not saved.
+    In an indexed pool file, parameters are not saved either (see 'stored').
+    """
+
+    def __init__(self, parameters, initial_move, tie_breaks):
+        super().__init__(parameters)
+
+        tie_breaks = np.asarray(tie_breaks, dtype=np.int64)
+
+        # Ranks are small: use the smallest type able to hold them
+        dtype = np.min_scalar_type(tie_breaks.max()) if len(tie_breaks) else np.uint8
+
+        self.initial_move = int(initial_move)
+        self.tie_breaks = tie_breaks.astype(dtype)
+
+        self._run = None
+
+    def replay(self):
+
+        """
+        Regenerate the run (only once)
+        :return: Backup of the run ('RunBackup' object)
+        """
+
+        if self._run is None:
+            from model import replay
+            self._run = replay.Replayer(self.parameters, self.initial_move, self.tie_breaks).run()
+
+        return self._run
+
+    @property
+    def positions(self):
+        return self.replay().positions
+
+    @property
+    def prices(self):
+        return self.replay().prices
+
+    @property
+    def profits(self):
+        return self.replay().profits
+
+    @property
+    def n_consumers(self):
+        return self.replay().n_consumers
+
+    def stored(self):
+
+        # Parameters are rebuilt from the index of the pool file, metrics are in the catalog (or recomputed)
+        return ReplayBackup(parameters=None, initial_move=self.initial_move, tie_breaks=self.tie_breaks)
+
+    def __getstate__(self):
+
+        # Regenerated trajectories are not saved; ranks are saved as raw bytes (much smaller than a pickled array)
+        state = self.__dict__.copy()
+        del state["_run"]
+        state["tie_breaks"] = (self.tie_breaks.dtype.str, self.tie_breaks.tobytes())
+        return state
+
+    def __setstate__(self, state):
+
+        # Backups saved before ranks were saved as raw bytes hold an array
+        if isinstance(state["tie_breaks"], tuple):
+            dtype, data = state["tie_breaks"]
+            state["tie_breaks"] = np.frombuffer(data, dtype=dtype).copy()
+
+        state["_run"] = None
+        self.__dict__.update(state)
+
+
+def compact(run_backup):
+
+    """
+    Keep only what is needed to replay a run (usable as a reducer, see 'produce_data' in main).
+    :param run_backup: Backup of a run, recorded by a model ('RunBackup' object)
+    :return: Compact backup ('ReplayBackup' object)
+    """
+
+    assert isinstance(run_backup, RunBackup) and run_backup.tie_breaks is not None, \
+        "Only runs of firms using non-learning, non-registered rules can be replayed."
+
+    return ReplayBackup(
+        parameters=run_backup.parameters, initial_move=run_backup.initial_move, tie_breaks=run_backup.tie_breaks)
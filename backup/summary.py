@@ -0,0 +1,120 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+from . backup import Backup
+
+
+# How many time steps from the end of the simulation are included in analysis
+SPAN_RATIO = 0.33  # Take last third
+
+# Metrics computed by 'summarize'
+METRICS = "distance", "distance_std", "price", "profit"
+
+
+def summarize(run_backup, span_ratio=SPAN_RATIO, metrics=METRICS):
+
+    """
+    Compute the metrics used by the 'pool' analysis for a single run.
+    :param run_backup: Backup of a run ('RunBackup' object, or 'RunSummary' holding the metrics requested)
+    :param span_ratio: Proportion of the last time steps included (float)
+    :param metrics: Names of the metrics needed (iterable of strings)
+    :return: Mean distance between firms (normalized), its std, mean price and mean profit (dictionary)
+    """
+
+    held = getattr(run_backup, "metrics", None)
+
+    if held is not None and run_backup.span_ratio == span_ratio and all(k in held for k in metrics):
+        # Already reduced by the worker
+        return held
+
+    assert not isinstance(run_backup, RunSummary), \
+        "Run reduced to {} (span ratio {}): {} (span ratio {}) cannot be computed.".format(
+            ", ".join(held), run_backup.span_ratio, ", ".join(metrics), span_ratio)
+
+    t_max = run_backup.parameters.t_max
+    n_positions = run_backup.parameters.n_positions
+
+    span = int(span_ratio * t_max)
+
+    if getattr(run_backup.parameters, "geometry", "line") == "grid":
+
+        # Positions are indexes of cells of a grid whose side is 'n_positions'
+        y, x = np.divmod(run_backup.positions[-span:, :], n_positions)
+        dy, dx = np.absolute(y[:, 0] - y[:, 1]), np.absolute(x[:, 0] - x[:, 1])
+
+        if run_backup.parameters.metric == "manhattan":
+            distance = (dx + dy) / n_positions
+        else:
+            distance = np.sqrt(dx ** 2 + dy ** 2) / n_positions
+
+    else:
+        distance = np.absolute(
+            run_backup.positions[-span:, 0] -
+            run_backup.positions[-span:, 1]) / n_positions
+
+    return {
+        "distance": float(np.mean(distance)),
+        "distance_std": float(np.std(distance)),
+        "price": float(np.mean(run_backup.prices[-span:, :])),
+        "profit": float(np.mean(run_backup.profits[-span:, :]))
+    }
+
+
+class RunSummary(Backup):
+
+    """
+    What remains of a run once reduced: its parameters and a few metrics.
+    """
+
+    def __init__(self, parameters, metrics, span_ratio):
+        super().__init__(parameters)
+
+        self.metrics = metrics
+        self.span_ratio = span_ratio
+
+
+class Reducer:
+
+    """
+    Reduce a run to its metrics inside the worker, so that only these are sent back to the parent process.
+    """
+
+    def __init__(self, metrics=None, span_ratio=SPAN_RATIO, keep_trajectories=False):
+
+        """
+        :param metrics: (Optional) Names of the metrics to keep, all of them by default (see 'summarize') (list)
+        :param span_ratio: Proportion of the last time steps included (float)
+        :param keep_trajectories: If True, the run backup is returned with its metrics attached (bool)
+        """
+
+        self.metrics = metrics
+        self.span_ratio = span_ratio
+        self.keep_trajectories = keep_trajectories
+
+    def __call__(self, run_backup):
+
+        metrics = summarize(run_backup, span_ratio=self.span_ratio)
+
+        if self.metrics is not None:
+            metrics = {k: metrics[k] for k in self.metrics}
+
+        if self.keep_trajectories:
+            run_backup.metrics = metrics
+            run_backup.span_ratio = self.span_ratio
+            return run_backup
+
+        return RunSummary(parameters=run_backup.parameters, metrics=metrics, span_ratio=self.span_ratio)
@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import multiprocessing as mlt
+import functools
 import tqdm
 import os
 import numpy as np
@@ -24,42 +25,188 @@ import model
 import analysis
 import backup
 import parameters
+import telemetry
+import sweep
+import pipeline
 
 import argparse
 
 
-def run(param):
+def run(param, reducer=None):
 
-    m = model.Model(param)
-    return m.run()
+    # Kernels of registered rules read columns of the payoff table: give them the cached one
+    registered = any(model.registry.is_registered(rule) for rule in (param.move, param.opp_move))
 
+    m = (model.FastModel if registered else model.Model)(param)
 
-def produce_data(parameters_file, data_file):
+    return reduce(m.run(), reducer=reducer)
+
+
+def reduce(bkp, reducer=None):
+
+    """
+    Summarize a run inside the worker, then apply the reducer: the parent process indexes the run from the metrics
+    sent along with it, without needing its trajectories (e.g. without replaying it)
+    :param bkp: Backup of a run ('RunBackup' object)
+    :param reducer: (Optional) Applied to the run (callable)
+    :return: Backup of the run, with its metrics attached
+    """
+
+    reduced = bkp if reducer is None else reducer(bkp)
+
+    # Reducers such as 'backup.Reducer' already attach metrics
+    if getattr(reduced, "metrics", None) is None:
+        reduced.metrics = backup.summarize(bkp)
+        reduced.span_ratio = backup.SPAN_RATIO
+
+    return reduced
+
+
+def run_batch(params, reducer=None):
+
+    if params[0].move in model.LEARNING:
+        # Learning firms are simulated simultaneously for runs sharing the same tables
+        return [reduce(bkp, reducer=reducer) for bkp in model.BatchedModel(params).run()]
+
+    return [run(param, reducer=reducer) for param in params]
+
+
+def tasks(pool_parameters):
+
+    """
+    Group the runs in the tasks sent to the workers (runs of learning firms sharing the same tables are batched).
+    :param pool_parameters: Parameters of the runs (list of 'Parameters' objects)
+    :return: For each task, index and parameters of its runs (list of lists of tuples)
+    """
+
+    if pool_parameters[0].move in model.LEARNING:
+        index = {id(param): i for i, param in enumerate(pool_parameters)}
+        return [[(index[id(param)], param) for param in batch] for batch in model.batches(pool_parameters)]
+
+    return [[(i, param)] for i, param in enumerate(pool_parameters)]
+
+
+def produce_data(parameters_file, data_file, status_file=None, tolerance=None, reducer=None, mapped=False,
+                 cost_file="data/costs.json", catalog_file="data/runs.sqlite"):
 
     """
     Produce data for 'pooled' condition using multiprocessing
     :param parameters_file: Path to parameters file (string)
     :param data_file: Path to the future data files (dictionary with two entries)
-    :return: a 'pool backup' (arbitrary Python object)
+    :param status_file: (Optional) Path to the JSON file where progress is reported
+    (by default, next to the data file) (string)
+    :param tolerance: (Optional) If given, seeds of a configuration stop being run once the confidence intervals
+    of mean distance, price and profit are narrower than 'tolerance' (relative to the scale of each metric) (float)
+    :param reducer: (Optional) Applied to each run inside the workers, for sending back only a summary of the run
+    (e.g. 'backup.Reducer' object) (callable)
+    :param mapped: If True, workers write trajectories directly in memory-mapped arrays, at the index of the run
+    (then the parent process never receives trajectories, and the order of runs does not depend on scheduling) (bool)
+    :param cost_file: Path to the JSON file where the durations of runs are learned, for estimating the cost
+    of tasks when scheduling them (string)
+    :param catalog_file: Path to the SQLite database indexing the parameters and metrics of every run (string)
+    :return: a 'pool backup' giving access to the runs one by one ('IndexedPoolBackup' object)
     """
 
     json_parameters = parameters.load(parameters_file)
 
     pool_parameters = parameters.extract_parameters(json_parameters)
 
-    pool = mlt.Pool()
+    if status_file is None:
+        status_file = os.path.splitext(data_file)[0] + ".status.json"
+
+    monitor = telemetry.Telemetry(status_file=status_file, n_runs=len(pool_parameters))
+
+    # The catalog is closed whatever happens (e.g. when runs failed)
+    with mlt.Pool() as pool, backup.Catalog(catalog_file) as catalog:
+
+        if tolerance is not None:
+
+            assert not mapped, "Runs of a sequential sweep cannot be written in memory-mapped arrays."
+
+            try:
+                return sweep.sequential_sweep(
+                    json_parameters=json_parameters, pool_parameters=pool_parameters, data_file=data_file,
+                    run=functools.partial(run, reducer=reducer), pool=pool, tolerance=tolerance, monitor=monitor,
+                    catalog=catalog)
+            finally:
+                monitor.close()
+
+        # Runs merged in chunks of similar estimated cost, largest batches of learning runs first
+        # (batches cannot be merged)
+        costs = telemetry.CostModel(cost_file=cost_file)
+        chunks = telemetry.schedule(
+            tasks(pool_parameters), cost=costs, n_workers=mlt.cpu_count(),
+            merge=pool_parameters[0].move not in model.LEARNING)
+
+        if mapped:
+
+            assert reducer is None, "Trajectories cannot be reduced when written in memory-mapped arrays."
+
+            # A previous pool is invalidated as soon as its buffers are overwritten
+            if os.path.exists(data_file):
+                os.remove(data_file)
+            catalog.forget(data_file)
 
-    backups = []
+            directory = os.path.splitext(data_file)[0] + ".buffers"
+            backup.TrajectoryBuffer(
+                directory, n_runs=len(pool_parameters), t_max=json_parameters["t_max"], mode="w+").flush()
 
-    for bkp in tqdm.tqdm(
-            pool.imap_unordered(run, pool_parameters),
-            total=len(pool_parameters)):
-        backups.append(bkp)
+            # Metrics computed by the workers, by index of run: the parent never reads the trajectories
+            metrics = {}
 
-    pool_backup = backup.PoolBackup(parameters=json_parameters, backups=backups)
-    pool_backup.save(parameters_file, data_file)
+            with tqdm.tqdm(total=len(pool_parameters)) as progress:
 
-    return pool_backup
+                for report in pool.imap_unordered(
+                        telemetry.Monitored(functools.partial(backup.write_runs, directory=directory, run=run_batch)),
+                        chunks):
+
+                    monitor.record(report)
+                    progress.update(report.n)
+
+                    if report.error is None:
+                        metrics.update(report.result)
+
+            monitor.close()
+
+            # Analyses expect every run of the parameters: a pool with missing runs is not saved
+            assert not monitor.n_failed, "{} run(s) failed, see '{}'.".format(monitor.n_failed, status_file)
+
+            costs.learn(pool_parameters, busy=monitor.busy())
+
+            pool_backup = backup.MappedPoolBackup(
+                parameters=json_parameters, run_parameters=pool_parameters, directory=directory)
+            pool_backup.save(parameters_file, data_file)
+
+            # Runs are indexed at their position in the buffer
+            for i, m in sorted(metrics.items()):
+                catalog.add(data_file, i, backup.RunSummary(
+                    parameters=pool_parameters[i], metrics=m, span_ratio=backup.SPAN_RATIO))
+
+            return pool_backup
+
+        # Runs are written to the disk as they come, so that they never need to be held in memory all together
+        with backup.PoolWriter(parameters=json_parameters, data_file=data_file, catalog=catalog) as writer, \
+                tqdm.tqdm(total=len(pool_parameters)) as progress:
+
+            for report in pool.imap_unordered(
+                    telemetry.Monitored(functools.partial(run_batch, reducer=reducer)),
+                    [[param for _, param in chunk] for chunk in chunks]):
+
+                monitor.record(report)
+                progress.update(report.n)
+
+                if report.error is None:
+                    for bkp in report.result:
+                        writer.write(bkp)
+
+            monitor.close()
+
+            # Analyses expect every run of the parameters: the partial file is deleted (see 'PoolWriter')
+            assert not monitor.n_failed, "{} run(s) failed, see '{}'.".format(monitor.n_failed, status_file)
+
+        costs.learn(pool_parameters, busy=monitor.busy())
+
+        return backup.IndexedPoolBackup(data_file)
 
 
 def data_already_produced(*args):
@@ -72,6 +219,72 @@ def data_already_produced(*args):
     return np.all([os.path.exists(i) for i in args])
 
 
+MOVES = [str(i).replace("Move.", "") for i in (
+    model.Move.max_profit, model.Move.strategic, model.Move.max_diff, model.Move.equal_sharing)]
+
+
+def produce_pool(parameters_file, data_file, adaptive=False, tolerance=None, summaries=False, mapped=False,
+                 replay=False, encoded=False):
+
+    """
+    Produce data for a pool (or a batch) of runs
+    :return: None
+    """
+
+    if adaptive:
+        catalog = backup.Catalog()
+        with mlt.Pool() as pool:
+            sweep.adaptive_sweep(
+                json_parameters=parameters.load(parameters_file), data_file=data_file, run=run, pool=pool,
+                catalog=catalog)
+        catalog.close()
+
+    else:
+        assert summaries + replay + encoded <= 1, \
+            "Runs can only be either reduced to summaries, kept replayable or encoded."
+
+        if summaries:
+            reducer = backup.Reducer()
+        elif replay:
+            reducer = backup.compact
+        elif encoded:
+            reducer = backup.encode_run
+        else:
+            reducer = None
+
+        produce_data(parameters_file, data_file, tolerance=tolerance, reducer=reducer, mapped=mapped)
+
+
+def produce_individual(parameters_file, data_file, n_threads=1):
+
+    """
+    Produce data for a single run (individual runs are dispatched in parallel by the pipeline)
+    :param n_threads: Number of threads evaluating the moves of the run (int)
+    :return: None
+    """
+
+    json_parameters = parameters.load(parameters_file)
+    param = parameters.extract_parameters(json_parameters)
+
+    if n_threads > 1 and param.move not in model.LEARNING:
+        # Same results as the reference model (see 'model.differential')
+        run_backup = model.FastModel(param, n_threads=n_threads).run()
+    else:
+        run_backup = run(param)
+    run_backup.save(parameters_file, data_file)
+
+    catalog = backup.Catalog()
+    catalog.forget(data_file)
+    catalog.add(data_file, None, run_backup)
+    catalog.close()
+
+
+def init_figure_process():
+
+    # Figures are drawn in worker processes, without display
+    matplotlib.use("Agg")
+
+
 def a_priori():
 
     """
@@ -86,186 +299,241 @@ def a_priori():
     )
 
 
-def pooled_data(args):
+def pool_figure(data_file, fig_name, density=False):
 
-    """
-    Produce figures for 'pooled' data
-    :param args: Parsed args from command line ('Namespace' object)
-    :return: None
-    """
+    # analysis.pool.distance(pool_backup=pool_backup, fig_name='fig/distance_{}.pdf'.format(move))
+    # analysis.pool.prices_and_profits(pool_backup=pool_backup,
+    #                                  fig_name='fig/prices_and_profits_{}.pdf'.format(move))
+    analysis.pool.distance_price_and_profit(pool_backup=backup.load_pool(data_file), fig_name=fig_name,
+                                            density=density)
 
-    for move in (str(i).replace("Move.", "") for i in (
-            model.Move.max_profit, model.Move.strategic, model.Move.max_diff, model.Move.equal_sharing)):
 
-        parameters_file = "data/json/pool_{}.json".format(move)
-        data_file = "data/pickle/pool_{}.p".format(move)
+def batch_figure(data_file, fig_name):
 
-        if not data_already_produced(data_file) or args.force:
-            pool_backup = produce_data(parameters_file, data_file)
+    analysis.batch.plot(batch_backup=backup.load_pool(data_file), fig_name=fig_name)
 
-        else:
-            pool_backup = backup.PoolBackup.load(data_file)
 
-        # analysis.pool.distance(pool_backup=pool_backup, fig_name='fig/distance_{}.pdf'.format(move))
-        # analysis.pool.prices_and_profits(pool_backup=pool_backup,
-        #                                  fig_name='fig/prices_and_profits_{}.pdf'.format(move))
-        analysis.pool.distance_price_and_profit(pool_backup=pool_backup,
-                                                fig_name="fig/distance_price_profit_{}.pdf".format(move))
+def batch_statistics_file(data_files, file_name):
 
+    batch_backups = {move: backup.load_pool(data_file) for move, data_file in data_files.items()}
+    analysis.batch.batch_statistics(batch_backups=batch_backups, file_name=file_name)
 
-def batch_data(args):
+
+def separate_figure(data_files, fig_name, density=False):
+
+    run_backups = [backup.RunBackup.load(data_file) for data_file in data_files]
+    analysis.separate.separate(backups=run_backups, fig_name=fig_name, density=density)
+
+
+def clustered_figure(pool_file, batch_file, individual_files, fig_name, density=False):
+
+    pool_backup = backup.load_pool(pool_file)
+    batch_backup = backup.load_pool(batch_file)
+    run_backups = [backup.RunBackup.load(data_file) for data_file in individual_files]
+
+    fig = plt.figure(figsize=(13.5, 7))
+    gs = matplotlib.gridspec.GridSpec(nrows=2, ncols=2, width_ratios=[1, 0.7])
+
+    analysis.pool.distance_price_and_profit(pool_backup=pool_backup, subplot_spec=gs[0, 0], density=density)
+    analysis.separate.separate(backups=run_backups, subplot_spec=gs[:, 1], density=density)
+    analysis.batch.plot(batch_backup=batch_backup, subplot_spec=gs[1, 0])
+
+    plt.tight_layout()
+
+    ax = fig.add_subplot(gs[:, :], zorder=-10)
+
+    plt.axis("off")
+    ax.text(
+        s="B", x=-0.05, y=0, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes,
+        fontsize=20)
+    ax.text(
+        s="A", x=-0.05, y=0.55, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes,
+        fontsize=20)
+    ax.text(
+        s="C", x=0.58, y=0, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes,
+        fontsize=20)
+
+    os.makedirs(os.path.dirname(fig_name), exist_ok=True)
+    plt.savefig(fig_name)
+    plt.close()
+
+
+def pool_data_task(dag, args, kind, move):
 
     """
-    Produce figures for 'pooled' data
-    :param args: Parsed args from command line ('Namespace' object)
-    :return: None
+    Add the task producing data for a pool ('pool') or a batch ('batch')
+    :return: Name of the task (string)
     """
 
-    for move in (str(i).replace("Move.", "") for i in (
-            model.Move.max_profit, model.Move.strategic, model.Move.max_diff, model.Move.equal_sharing)):
+    parameters_file = "data/json/{}_{}.json".format(kind, move)
+    data_file = "data/pickle/{}_{}.p".format(kind, move)
 
-        parameters_file = "data/json/batch_{}.json".format(move)
-        data_file = "data/pickle/batch_{}.p".format(move)
+    options = dict(tolerance=args.tolerance)
+    if kind == "pool":
+        options.update(adaptive=args.adaptive, summaries=args.summaries, mapped=args.mapped, replay=args.replay,
+                       encoded=args.encoded)
 
-        if not data_already_produced(data_file) or args.force:
-            batch_backup = produce_data(parameters_file, data_file)
+    # Trajectories of mapped pools are in a directory next to the data file: figures depend on it too
+    outputs = [data_file]
+    if kind == "pool" and args.mapped:
+        outputs.append(os.path.splitext(data_file)[0] + ".buffers")
 
-        else:
-            batch_backup = backup.PoolBackup.load(data_file)
-
-        analysis.batch.plot(batch_backup=batch_backup, fig_name='fig/batch_{}.pdf'.format(move))
+    return dag.add(
+        name="data/{}_{}".format(kind, move), func=produce_pool,
+        kwargs=dict(parameters_file=parameters_file, data_file=data_file, **options),
+        inputs=[parameters_file], outputs=outputs, executor="thread", force=args.force)
 
 
-def individual_data(args):
+def individual_data_tasks(dag, args, move):
 
     """
-    Produce figures for 'individual' data
-    :param args: Parsed args from command line ('Namespace' object)
-    :return: None
+    Add the tasks producing data for single runs
+    :return: Names of the tasks (list)
     """
 
-    for move in (str(i).replace("Move.", "") for i in (
-            model.Move.max_profit, model.Move.strategic, model.Move.max_diff, model.Move.equal_sharing)):
+    names = []
 
-        run_backups = []
+    for r in ("25", "50"):  # , "75"):
 
-        for r in ("25", "50"):  # , "75"):
+        parameters_file = "data/json/{}_{}.json".format(r, move)
+        data_file = "data/pickle/{}_{}.p".format(r, move)
 
-            parameters_file = "data/json/{}_{}.json".format(r, move)
-            data_file = "data/pickle/{}_{}.p".format(r, move)
+        names.append(dag.add(
+            name="data/{}_{}".format(r, move), func=produce_individual,
+            kwargs=dict(parameters_file=parameters_file, data_file=data_file, n_threads=args.threads),
+            inputs=[parameters_file], outputs=[data_file], force=args.force))
 
-            if not data_already_produced(parameters_file, data_file) or args.force:
+    return names
 
-                json_parameters = parameters.load(parameters_file)
-                param = parameters.extract_parameters(json_parameters)
-                run_backup = run(param)
-                run_backup.save(parameters_file, data_file)
 
-            else:
-                run_backup = backup.RunBackup.load(data_file)
+def pooled_data(args, dag):
 
-            run_backups.append(run_backup)
+    """
+    Add tasks producing figures for 'pooled' data
+    :param args: Parsed args from command line ('Namespace' object)
+    :param dag: Tasks to execute ('Pipeline' object)
+    :return: None
+    """
 
-        analysis.separate.separate(backups=run_backups, fig_name='fig/separate_{}.pdf'.format(move))
+    for move in MOVES:
 
+        data = pool_data_task(dag, args, "pool", move)
+        fig_name = "fig/distance_price_profit_{}.pdf".format(move)
 
-def clustered_data(args):
+        dag.add(name=fig_name, func=pool_figure,
+                kwargs=dict(data_file=dag.tasks[data].outputs[0], fig_name=fig_name, density=args.density),
+                outputs=[fig_name], deps=[data])
 
-    for move in (str(i).replace("Move.", "") for i in (
-            model.Move.max_profit, model.Move.strategic, model.Move.max_diff, model.Move.equal_sharing)):
 
-        parameters_file = "data/json/pool_{}.json".format(move)
-        data_file = "data/pickle/pool_{}.p".format(move)
+def batch_data(args, dag):
 
-        if not data_already_produced(data_file) or args.force:
-            pool_backup = produce_data(parameters_file, data_file)
+    """
+    Add tasks producing figures for 'batch' data
+    :param args: Parsed args from command line ('Namespace' object)
+    :param dag: Tasks to execute ('Pipeline' object)
+    :return: None
+    """
 
-        else:
-            pool_backup = backup.PoolBackup.load(data_file)
+    data_files = {}
+
+    for move in MOVES:
 
-        run_backups = []
+        data = pool_data_task(dag, args, "batch", move)
+        fig_name = "fig/batch_{}.pdf".format(move)
 
-        for r in ("25", "50"):  # , "75"):
+        dag.add(name=fig_name, func=batch_figure, kwargs=dict(data_file=dag.tasks[data].outputs[0], fig_name=fig_name),
+                outputs=[fig_name], deps=[data])
 
-            parameters_file = "data/json/{}_{}.json".format(r, move)
-            data_file = "data/pickle/{}_{}.p".format(r, move)
+        data_files[move] = dag.tasks[data].outputs[0]
 
-            if not data_already_produced(parameters_file, data_file) or args.force:
+    # Differences between move rules and values of 'r' (bootstrap confidence intervals and permutation tests)
+    file_name = "fig/batch_statistics.csv"
+    dag.add(name=file_name, func=batch_statistics_file, kwargs=dict(data_files=data_files, file_name=file_name),
+            outputs=[file_name], deps=["data/batch_{}".format(move) for move in MOVES])
 
-                json_parameters = parameters.load(parameters_file)
-                param = parameters.extract_parameters(json_parameters)
-                run_backup = run(param)
-                run_backup.save(parameters_file, data_file)
 
-            else:
-                run_backup = backup.RunBackup.load(data_file)
+def individual_data(args, dag):
 
-            run_backups.append(run_backup)
+    """
+    Add tasks producing figures for 'individual' data
+    :param args: Parsed args from command line ('Namespace' object)
+    :param dag: Tasks to execute ('Pipeline' object)
+    :return: None
+    """
 
-        parameters_file = "data/json/batch_{}.json".format(move)
-        data_file = "data/pickle/batch_{}.p".format(move)
+    for move in MOVES:
 
-        if not data_already_produced(data_file) or args.force:
-            batch_backup = produce_data(parameters_file, data_file)
+        data = individual_data_tasks(dag, args, move)
+        fig_name = "fig/separate_{}.pdf".format(move)
 
-        else:
-            batch_backup = backup.PoolBackup.load(data_file)
+        dag.add(name=fig_name, func=separate_figure,
+                kwargs=dict(data_files=[dag.tasks[d].outputs[0] for d in data], fig_name=fig_name,
+                            density=args.density),
+                outputs=[fig_name], deps=data)
 
-        fig = plt.figure(figsize=(13.5, 7))
-        gs = matplotlib.gridspec.GridSpec(nrows=2, ncols=2, width_ratios=[1, 0.7])
 
-        analysis.pool.distance_price_and_profit(pool_backup=pool_backup, subplot_spec=gs[0, 0])
-        analysis.separate.separate(backups=run_backups, subplot_spec=gs[:, 1])
-        analysis.batch.plot(batch_backup=batch_backup, subplot_spec=gs[1, 0])
+def clustered_data(args, dag):
 
-        plt.tight_layout()
+    """
+    Add tasks producing figures in a 'clustered' mode (data tasks are shared with the other figures)
+    :param args: Parsed args from command line ('Namespace' object)
+    :param dag: Tasks to execute ('Pipeline' object)
+    :return: None
+    """
 
-        ax = fig.add_subplot(gs[:, :], zorder=-10)
+    for move in MOVES:
 
-        plt.axis("off")
-        ax.text(
-            s="B", x=-0.05, y=0, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes,
-            fontsize=20)
-        ax.text(
-            s="A", x=-0.05, y=0.55, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes,
-            fontsize=20)
-        ax.text(
-            s="C", x=0.58, y=0, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes,
-            fontsize=20)
+        pool = pool_data_task(dag, args, "pool", move)
+        batch = pool_data_task(dag, args, "batch", move)
+        individual = individual_data_tasks(dag, args, move)
 
         fig_name = "fig/clustered_{}.pdf".format(move)
-        os.makedirs(os.path.dirname(fig_name), exist_ok=True)
-        plt.savefig(fig_name)
-        plt.show()
+
+        dag.add(name=fig_name, func=clustered_figure,
+                kwargs=dict(
+                    pool_file=dag.tasks[pool].outputs[0], batch_file=dag.tasks[batch].outputs[0],
+                    individual_files=[dag.tasks[d].outputs[0] for d in individual], fig_name=fig_name,
+                    density=args.density),
+                outputs=[fig_name], deps=[pool, batch] + individual)
 
 
 def main(args):
 
     """
-    Depending on args given in command line, call the right function(s)
+    Depending on args given in command line, build the graph of tasks producing data and figures,
+    then execute the ones that are not up to date
     :param args: Parsed args from command line ('Namespace' object)
     :return: None
     """
 
     if args.new:
         args.force = True
-        parameters.generate_new_parameters_files()
+
+    dag = pipeline.Pipeline(initializer=init_figure_process)
 
     if args.pooled:
-        pooled_data(args)
+        pooled_data(args, dag)
 
     if args.individual:
-        individual_data(args)
+        individual_data(args, dag)
 
     if args.batch:
-        batch_data(args)
+        batch_data(args, dag)
 
     if args.a_priori:
-        a_priori()
+        dag.add(name="fig/a_priori", func=a_priori,
+                outputs=["fig/targetable_consumers.pdf", "fig/captive_consumers.pdf"])
 
     if (not args.pooled and not args.individual and not args.batch and not args.a_priori) or args.clustered:
-        clustered_data(args)
+        clustered_data(args, dag)
 
+    # Parameters files are generated once, before tasks read them concurrently
+    if args.new or not all(os.path.exists(f) for t in dag.tasks.values() for f in t.inputs if f.endswith(".json")):
+        parameters.generate_new_parameters_files()
+
+    executed, skipped = dag.run()
+
+    print("{} task(s) executed, {} up to date.".format(len(executed), len(skipped)))
     print("Figures have been created in 'fig' folder.")
 
 
@@ -286,8 +554,30 @@ if __name__ == "__main__":
                         help="Do figures ONLY for a priori analysis")
     parser.add_argument('-b', '--batch', action="store_true", default=False,
                         help="Do figures ONLY for batch analysis (2 values of r)")
+    parser.add_argument('-d', '--adaptive', action="store_true", default=False,
+                        help="For pooled results, sample 'r' adaptively instead of uniformly")
+    parser.add_argument('-t', '--tolerance', type=float, default=None,
+                        help="Stop running seeds of a configuration once the confidence intervals of its outcomes "
+                             "are narrower than this tolerance (relative to the scale of each metric)")
+    parser.add_argument('-s', '--summaries', action="store_true", default=False,
+                        help="For pooled results, keep only a summary of each run (not its trajectories)")
+    parser.add_argument('-r', '--replay', action="store_true", default=False,
+                        help="For pooled results, keep only what is needed to replay each run "
+                             "(trajectories are regenerated when analyzed)")
+    parser.add_argument('-z', '--encoded', action="store_true", default=False,
+                        help="For pooled results, store trajectories as a head followed by a repeated cycle")
+    parser.add_argument('-m', '--mapped', action="store_true", default=False,
+                        help="For pooled results, store trajectories in memory-mapped arrays written by the workers")
+    parser.add_argument('-e', '--density', action="store_true", default=False,
+                        help="Draw positions as densities (binned in a single image) instead of one marker by point")
+    parser.add_argument('-j', '--threads', type=int, default=1,
+                        help="For individual results, number of threads evaluating the moves of each run")
     parser.add_argument('-c', '--clustered', action="store_true", default=False,
                         help="Do figures in a 'clustered' mode")
     parsed_args = parser.parse_args()
 
+    if parsed_args.tolerance is not None and parsed_args.mapped:
+        parser.error("'--tolerance' cannot be combined with '--mapped' (runs of a sequential sweep are written "
+                     "as they converge, not at a fixed index).")
+
     main(parsed_args)
@@ -1 +1,7 @@
 from . model import *
+from . batched import BatchedModel, batches
+from . fast import FastModel
+from . replay import Replayer
+from . analytic import AnalyticModel
+from . exact import ExactModel
+from . import registry
@@ -0,0 +1,145 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+from . import model
+
+
+# Rules whose best replies can be found region by region (see 'AnalyticModel')
+ANALYTIC = model.Move.max_profit, model.Move.max_diff, model.Move.equal_sharing
+
+
+class AnalyticModel(model.Model):
+
+    """
+    Same model, for 'max_profit', 'max_diff' and 'equal_sharing', without evaluating every strategy.
+    Given the position of each firm, the numbers of consumers only depend on whether the firm is cheaper than,
+    as cheap as, or more expensive than its opponent: the prices of a firm split in (at most) three regions
+    in which consumers are constant, and in which the value of a strategy cannot decrease with the price.
+    The maximal value is therefore among the tops of the regions (O(n_positions) values), and only the regions
+    whose top reaches it are evaluated entirely, for getting exactly the same tie sets as 'Model'
+    (values are computed with the same floating point operations). No payoff table is built,
+    so fine price grids stay affordable.
+    """
+
+    def __init__(self, param):
+
+        super().__init__(param)
+
+        assert all(rule in ANALYTIC for rule in self.rules), \
+            "Only {} have analytic best replies.".format(", ".join(str(m) for m in ANALYTIC))
+        assert self.temperature == 0, "Price regions only hold when consumers choose the cheaper firm."
+
+        rules = {
+
+            model.Move.max_profit: self.move_profit_based,
+            model.Move.max_diff: self.move_diff_based,
+            model.Move.equal_sharing: self.move_equal_sharing
+
+        }
+
+        self.moves = [rules[rule] for rule in self.rules]
+        self.move = self.moves[0]
+
+    def regions(self, opp_move):
+
+        """
+        Price regions of the firm against the move of its opponent.
+        :param opp_move: Move of the opponent (int)
+        :return: Price of the opponent, then for each region (cheaper, as cheap, more expensive):
+        lowest and highest price indexes, consumers of the firm and of its opponent for each position of the firm
+        (float, list of tuples)
+        """
+
+        opp_position, q = self.strategies[opp_move]
+
+        captive_0 = self.n_consumers[:, opp_position, 0].astype(float)
+        captive_1 = self.n_consumers[:, opp_position, 1].astype(float)
+        to_share = self.n_consumers[:, opp_position, 2]
+
+        regions = []
+
+        if q > 0:
+            regions.append((0, q - 1, captive_0 + to_share, captive_1))
+
+        regions.append((q, q, captive_0 + to_share / 2, captive_1 + to_share / 2))
+
+        if q < self.n_prices - 1:
+            regions.append((q + 1, self.n_prices - 1, captive_0, captive_1 + to_share))
+
+        return self.prices[q], regions
+
+    def best(self, regions, value):
+
+        """
+        Moves of maximal value.
+        :param regions: Output of 'regions'
+        :param value: Value of strategies given the region, positions and price indexes (callable)
+        :return: Moves of maximal value, sorted (np.array)
+        """
+
+        all_positions = np.arange(self.n_locations)
+
+        tops = [value(r, all_positions, np.full(self.n_locations, r[1])) for r in regions]
+        max_value = max(np.max(top) for top in tops)
+
+        idx = []
+
+        for r, top in zip(regions, tops):
+
+            positions = np.flatnonzero(top == max_value)
+            if not len(positions):
+                continue
+
+            # Evaluate entirely the regions reaching the maximum
+            price_idx = np.arange(r[0], r[1] + 1)
+            values = value(r, positions[:, None], price_idx[None, :])
+
+            pos, k = np.nonzero(values == max_value)
+            idx.append(positions[pos] * self.n_prices + price_idx[k])
+
+        return np.sort(np.concatenate(idx))
+
+    def move_profit_based(self, opp_move):
+
+        _, regions = self.regions(opp_move)
+
+        def value(r, x, k):
+            return r[2][x] * self.prices[k]
+
+        return self.choose(self.best(regions, value))
+
+    def move_diff_based(self, opp_move):
+
+        opp_price, regions = self.regions(opp_move)
+
+        def value(r, x, k):
+            return r[2][x] * self.prices[k] - r[3][x] * opp_price
+
+        return self.choose(self.best(regions, value))
+
+    def move_equal_sharing(self, opp_move):
+
+        opp_price, regions = self.regions(opp_move)
+
+        # Maximal profits of the firm and of its opponent over all the strategies of the firm
+        max_profits_0 = max(np.max(r[2] * self.prices[r[1]]) for r in regions)
+        max_profits_1 = max(np.max(r[3] * opp_price) for r in regions)
+
+        def value(r, x, k):
+            return (r[2][x] * self.prices[k] - max_profits_0) + (r[3][x] * opp_price - max_profits_1)
+
+        return self.choose(self.best(regions, value))
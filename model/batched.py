@@ -0,0 +1,217 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import numpy as np
+
+import backup
+
+from . import model
+from . import registry
+
+
+class BatchedModel:
+
+    """
+    Run simultaneously several economies sharing the same tables (they differ only by their seed),
+    with learning firms (or firms using a rule registered in 'registry') whose state is kept in arrays
+    (one row per run).
+    Each run has its own random stream, so results do not depend on the composition of the batch.
+    """
+
+    def __init__(self, params):
+
+        """
+        :param params: Parameters of the runs (list of 'Parameters' objects)
+        """
+
+        assert len({model.tables_key(p) for p in params}) == 1, "Runs of a batch have to share the same tables."
+        assert len({p.move for p in params}) == 1, "Runs of a batch have to use the same move rule."
+        assert all(p.opp_move in (None, p.move) for p in params), "Firms of a batch have to use the same move rule."
+
+        self.parameters = params
+
+        # Only used for building the tables
+        m = model.Model(params[0])
+
+        self.t_max = m.t_max
+        self.strategies = m.strategies
+        self.prices = m.prices
+        self.n_strategies = m.n_strategies
+
+        self.n_runs = len(params)
+        self.runs = np.arange(self.n_runs)
+
+        self.consumers = m.compute_consumers_given_moves()
+        self.payoffs = m.compute_payoffs(n_consumers=self.consumers)
+
+        # Profit of a firm given its move and the move of its opponent (tables are symmetric)
+        self.own_payoffs = self.payoffs[:, :, 0]
+
+        self.rngs = [np.random.RandomState(p.seed) for p in params]
+
+        self.alpha = np.array([p.alpha for p in params])
+        self.epsilon = np.array([p.epsilon for p in params])
+
+        # Learning state: for each run and each firm, counts of the moves of the opponent / values of own moves
+        self.beliefs = np.zeros((self.n_runs, 2, self.n_strategies))
+        self.q = np.zeros((self.n_runs, 2, self.n_strategies))
+
+        if registry.is_registered(params[0].move):
+
+            # Rule given by a kernel: one state by firm, with a leading batch axis
+            self.rule = registry.get(params[0].move)
+            self.states = [registry.init_state(self.rule, self.n_strategies, (self.n_runs, )) for _ in range(2)]
+            self.move = self.move_kernel
+
+        else:
+
+            self.move = {
+
+                model.Move.fictitious_play: self.move_fictitious_play,
+                model.Move.q_learning: self.move_q_learning
+
+            }[params[0].move]
+
+    @staticmethod
+    def random_choice(scores, u):
+
+        """
+        For each run, choose uniformly one of the moves with maximal score.
+        :param scores: Score of each move for each run (np.array n_runs x n_strategies)
+        :param u: Uniform random number for each run (np.array of length n_runs)
+        :return: Selected moves (np.array of length n_runs)
+        """
+
+        ties = scores == scores.max(axis=1, keepdims=True)
+        k = (u * ties.sum(axis=1)).astype(int)
+
+        return np.argmax(np.cumsum(ties, axis=1) > k[:, None], axis=1)
+
+    def move_fictitious_play(self, active, opp_moves, u):
+
+        """
+        Best response to the empirical distribution of the moves of the opponent.
+        :param active: Id of the firm that plays (int)
+        :param opp_moves: Move of the opponent in each run (np.array of length n_runs)
+        :param u: Uniform random numbers (np.array n_runs x 3)
+        :return: Selected moves (np.array of length n_runs)
+        """
+
+        self.beliefs[self.runs, active, opp_moves] += 1
+
+        exp_profits = self.beliefs[:, active] @ self.own_payoffs.T
+
+        return self.random_choice(exp_profits, u[:, 0])
+
+    def move_q_learning(self, active, opp_moves, u):
+
+        """
+        Epsilon-greedy choice on the estimated value of each move, then update of this value with the profit obtained.
+        :param active: Id of the firm that plays (int)
+        :param opp_moves: Move of the opponent in each run (np.array of length n_runs)
+        :param u: Uniform random numbers (np.array n_runs x 3)
+        :return: Selected moves (np.array of length n_runs)
+        """
+
+        greedy = self.random_choice(self.q[:, active], u[:, 0])
+        explore = (u[:, 2] * self.n_strategies).astype(int)
+
+        moves = np.where(u[:, 1] < self.epsilon, explore, greedy)
+
+        reward = self.own_payoffs[moves, opp_moves]
+        self.q[self.runs, active, moves] += self.alpha * (reward - self.q[self.runs, active, moves])
+
+        return moves
+
+    def move_kernel(self, active, opp_moves, u):
+
+        """
+        Moves of maximal score according to the kernel of a registered rule (see 'registry'), for all the runs at once.
+        :param active: Id of the firm that plays (int)
+        :param opp_moves: Move of the opponent in each run (np.array of length n_runs)
+        :param u: Uniform random numbers (np.array n_runs x 3)
+        :return: Selected moves (np.array of length n_runs)
+        """
+
+        state = self.states[active]
+        state["opp_move"] = opp_moves
+
+        # Column of the payoff table for the move of the opponent in each run (n_runs x n_strategies x 2)
+        column = self.payoffs[:, opp_moves, :].transpose(1, 0, 2)
+
+        scores = self.rule.kernel(column, state, registry.BatchRandomState(self.rngs))
+
+        return self.random_choice(scores, u[:, 0])
+
+    def run(self):
+
+        """
+        Run the simulations.
+        :return: A backup for each run (list of 'RunBackup' objects)
+        """
+
+        positions = np.zeros((self.n_runs, self.t_max, 2), dtype=int)
+        prices = np.zeros((self.n_runs, self.t_max, 2))
+        n_consumers = np.zeros((self.n_runs, self.t_max, 2))
+        profits = np.zeros((self.n_runs, self.t_max, 2))
+
+        moves = np.zeros((self.n_runs, 2), dtype=int)
+
+        active = 0
+
+        moves[:, 0] = -99
+        moves[:, 1] = [rng.randint(low=0, high=self.n_strategies) for rng in self.rngs]
+
+        for t in range(self.t_max):
+
+            passive = (active + 1) % 2
+
+            u = np.array([rng.random_sample(3) for rng in self.rngs])
+
+            moves[:, active] = self.move(active, moves[:, passive], u)
+
+            positions[:, t, :] = self.strategies[moves, 0]
+            prices[:, t, :] = self.prices[self.strategies[moves, 1]]
+            n_consumers[:, t, :] = self.consumers[moves[:, 0], moves[:, 1]]
+            profits[:, t, :] = self.payoffs[moves[:, 0], moves[:, 1]]
+
+            active = passive
+
+        return [
+            backup.RunBackup(
+                parameters=p, positions=positions[i], prices=prices[i], profits=profits[i],
+                n_consumers=n_consumers[i])
+            for i, p in enumerate(self.parameters)
+        ]
+
+
+def batches(params, size=100):
+
+    """
+    Group runs sharing the same tables in batches.
+    :param params: Parameters of the runs (list of 'Parameters' objects)
+    :param size: Maximal number of runs in a batch (int)
+    :return: Batches (list of lists of 'Parameters' objects)
+    """
+
+    groups = {}
+    for p in params:
+        groups.setdefault((model.tables_key(p), p.move), []).append(p)
+
+    return [
+        list(itertools.islice(g, i, i + size))
+        for g in groups.values() for i in range(0, len(g), size)
+    ]
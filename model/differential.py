@@ -0,0 +1,144 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import numpy as np
+
+from . import model
+
+
+RECORDS = "positions", "prices", "n_consumers", "profits"
+
+
+def compare(engine, params, reference=model.Model):
+
+    """
+    Run the reference model and an alternative engine on the same parameters, and compare their records.
+    Both seed the random stream with the seed of the run, so given the same tie sets they make the same choices.
+    :param engine: Class or function building an object with a 'run' method from parameters (callable)
+    :param params: Parameters of the runs (list of 'Parameters' objects)
+    :param reference: Reference engine (callable)
+    :return: For each run, its configuration, the records that differ, the durations and the speedup (list of dict)
+    """
+
+    report = []
+
+    for p in params:
+
+        t0 = time.perf_counter()
+        expected = reference(p).run()
+        t1 = time.perf_counter()
+        obtained = engine(p).run()
+        t2 = time.perf_counter()
+
+        mismatch = [k for k in RECORDS if not np.array_equal(getattr(expected, k), getattr(obtained, k))]
+
+        report.append({
+            "move": str(p.move).replace("Move.", ""),
+            "r": p.r,
+            "seed": p.seed,
+            "identical": not mismatch,
+            "mismatch": mismatch,
+            "t_reference": t1 - t0,
+            "t_engine": t2 - t1,
+            "speedup": (t1 - t0) / max(t2 - t1, 1e-9)
+        })
+
+    return report
+
+
+def check(engine, params, reference=model.Model):
+
+    """
+    Same as 'compare', but fails if any run is not reproduced exactly.
+    """
+
+    report = compare(engine=engine, params=params, reference=reference)
+
+    failures = [i for i in report if not i["identical"]]
+
+    assert not failures, "{} run(s) not reproduced: {}".format(
+        len(failures), ", ".join("{move} r={r:.3f} seed={seed} ({mismatch})".format(
+            move=i["move"], r=i["r"], seed=i["seed"], mismatch="/".join(i["mismatch"])) for i in failures))
+
+    return report
+
+
+def default_parameters(n_radii=10, n_seeds=3, moves=None, **kwargs):
+
+    """
+    Parameters covering every (non learning) move rule, several radii and several seeds.
+    :param n_radii: Number of radii (int)
+    :param n_seeds: Number of seeds by radius (int)
+    :param moves: (Optional) Move rules (iterable of 'Move')
+    :param kwargs: Other parameters (see 'Parameters')
+    :return: Parameters (list of 'Parameters' objects)
+    """
+
+    import parameters
+
+    if moves is None:
+        moves = [m for m in model.Move if m not in model.LEARNING]
+
+    kwargs = dict(dict(n_positions=21, n_prices=11, p_min=1, p_max=11, t_max=25), **kwargs)
+
+    return [
+        parameters.Parameters(r=r, seed=seed, move=m, **kwargs)
+        for m in moves
+        for r in np.linspace(0.05, 1, n_radii)
+        for seed in range(1, n_seeds + 1)
+    ]
+
+
+def summary(report):
+
+    """
+    :param report: Output of 'compare'
+    :return: Number of identical runs and median speedup for each move rule (string)
+    """
+
+    lines = []
+
+    for move in sorted({i["move"] for i in report}):
+        r = [i for i in report if i["move"] == move]
+        lines.append("{:<16} {:>4}/{:<4} identical   median speedup x{:.1f}".format(
+            move, sum(i["identical"] for i in r), len(r), np.median([i["speedup"] for i in r])))
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    from . import analytic, exact, fast
+
+    parser = argparse.ArgumentParser(description="Check that an engine reproduces the reference model.")
+    parser.add_argument('--engine', choices=("fast", "analytic", "exact"), default="fast")
+    parser.add_argument('--n_radii', type=int, default=5)
+    parser.add_argument('--n_seeds', type=int, default=2)
+    parser.add_argument('--t_max', type=int, default=10,
+                        help="Keep it low: the reference 'strategic' rule costs S^2 profit evaluations per step")
+    parsed_args = parser.parse_args()
+
+    if parsed_args.engine == "analytic":
+        engine, moves = analytic.AnalyticModel, analytic.ANALYTIC
+    elif parsed_args.engine == "exact":
+        engine, moves = exact.ExactModel, exact.EXACT
+    else:
+        engine, moves = fast.FastModel, None
+
+    print(summary(check(engine=engine, params=default_parameters(
+        n_radii=parsed_args.n_radii, n_seeds=parsed_args.n_seeds, moves=moves, t_max=parsed_args.t_max))))
@@ -0,0 +1,178 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import fractions
+import math
+import numpy as np
+
+from . import model
+
+
+# Rules evaluated on integer tables (see 'ExactModel')
+EXACT = model.Move.max_profit, model.Move.max_diff, model.Move.equal_sharing, model.Move.strategic
+
+# Integer tables already computed (within a process)
+_tables = {}
+
+
+def price_units(p_min, p_max, n_prices, max_denominator=10**6):
+
+    """
+    Express the prices of the grid as integers: price k is units[k] / denominator, exactly.
+    :param p_min: Minimal price (float)
+    :param p_max: Maximal price (float)
+    :param n_prices: Number of prices (int)
+    :param max_denominator: Largest denominator accepted for 'p_min' and 'p_max' (e.g. 0.1 is read as 1/10) (int)
+    :return: Prices in units, size of the unit (np.array of int, int)
+    """
+
+    p_min = fractions.Fraction(p_min).limit_denominator(max_denominator)
+    p_max = fractions.Fraction(p_max).limit_denominator(max_denominator)
+
+    prices = [p_min + k * (p_max - p_min) / (n_prices - 1) for k in range(n_prices)]
+
+    denominator = 1
+    for p in prices:
+        denominator = denominator * p.denominator // math.gcd(denominator, p.denominator)
+
+    return np.array([int(p * denominator) for p in prices], dtype=np.int64), denominator
+
+
+def smallest_int(max_value):
+
+    # Smallest signed type able to hold values in [-max_value, max_value]
+    for dtype in (np.int16, np.int32, np.int64):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+
+    raise OverflowError("Payoffs do not fit in 64 bits.")
+
+
+class ExactModel(model.Model):
+
+    """
+    Same model, with moves evaluated on integer tables: consumers are counted in half-units and prices in units of
+    the grid, so that payoffs are integers (int16 or int32 for usual grids, instead of float64).
+    Ties are detected exactly, whatever the engine or the platform; they are the ones of 'Model' whenever
+    its floating point values are exact (e.g. prices on an integer grid).
+    For 'strategic', the expected profit of the next step is a ratio: candidates are preselected with floats,
+    then compared as exact fractions.
+    Records (consumers, profits) are computed as in 'Model'.
+    """
+
+    def __init__(self, param):
+
+        super().__init__(param)
+
+        assert all(rule in EXACT for rule in self.rules), \
+            "Only {} are evaluated on integer tables.".format(", ".join(str(m) for m in EXACT))
+        assert self.temperature == 0, "Payoffs are only integer when consumers choose the cheaper firm."
+
+        if self.tables_key not in _tables:
+            _tables[self.tables_key] = self.compute_integer_payoffs()
+
+        self.payoffs = _tables[self.tables_key]
+
+        rules = {
+
+            model.Move.max_profit: self.move_profit_based,
+            model.Move.max_diff: self.move_diff_based,
+            model.Move.equal_sharing: self.move_equal_sharing,
+            model.Move.strategic: self.move_profit_strategic_based
+
+        }
+
+        self.moves = [rules[rule] for rule in self.rules]
+        self.move = self.moves[0]
+
+        if model.Move.strategic in self.rules:
+            self.next_sums, self.next_counts = self.compute_next_profits()
+
+    def compute_integer_payoffs(self):
+
+        """
+        Compute the profits of both firms for every combination of moves, in units of
+        half a consumer times the unit of price (see 'price_units').
+        :return: Integer profits (np.array of dimension n_strategies, n_strategies, 2)
+        """
+
+        units, _ = price_units(self.p_min, self.p_max, self.n_prices)
+
+        pos = self.strategies[:, 0]
+        price = self.strategies[:, 1]
+
+        captive = self.n_consumers[pos[:, None], pos[None, :], :2].astype(np.int64)
+        to_share = self.n_consumers[pos[:, None], pos[None, :], 2].astype(np.int64)
+
+        equal = price[:, None] == price[None, :]
+        cheaper = price[:, None] < price[None, :]
+
+        half_consumers = 2 * captive
+        half_consumers[:, :, 0] += np.where(equal, to_share, np.where(cheaper, 2 * to_share, 0))
+        half_consumers[:, :, 1] += np.where(equal, to_share, np.where(cheaper | equal, 0, 2 * to_share))
+
+        payoffs = half_consumers * np.stack(np.broadcast_arrays(units[price, None], units[None, price]), axis=-1)
+
+        # Differences of two payoffs are computed too: keep room for them
+        return payoffs.astype(smallest_int(2 * np.max(payoffs)))
+
+    def compute_next_profits(self):
+
+        """
+        For each move, sum and number of the profits of the firm over the best replies of its opponent
+        (the expected profit of the next step is their ratio).
+        :return: Sums and counts (np.array of int64, np.array of int64)
+        """
+
+        own, opp = self.payoffs[:, :, 0], self.payoffs[:, :, 1]
+
+        response = opp == opp.max(axis=1, keepdims=True)
+
+        return np.sum(np.where(response, own.astype(np.int64), 0), axis=1), np.sum(response, axis=1)
+
+    @staticmethod
+    def ties(values):
+        return np.flatnonzero(values == np.max(values))
+
+    def move_profit_based(self, opp_move):
+
+        return self.choose(self.ties(self.payoffs[:, opp_move, 0]))
+
+    def move_diff_based(self, opp_move):
+
+        exp_profits = self.payoffs[:, opp_move, :]
+
+        return self.choose(self.ties(exp_profits[:, 0] - exp_profits[:, 1]))
+
+    def move_equal_sharing(self, opp_move):
+
+        exp_profits = self.payoffs[:, opp_move, :]
+
+        return self.choose(self.ties(np.sum(exp_profits - np.max(exp_profits, axis=0), axis=1)))
+
+    def move_profit_strategic_based(self, opp_move):
+
+        profits_t = self.payoffs[:, opp_move, 0]
+
+        # Candidates within rounding errors of the maximum, then exact comparison
+        values = profits_t + self.next_sums / self.next_counts
+        max_value = np.max(values)
+        candidates = np.flatnonzero(values >= max_value - 1e-9 * max(abs(max_value), 1))
+
+        exact = [fractions.Fraction(int(profits_t[i]) * int(self.next_counts[i]) + int(self.next_sums[i]),
+                                    int(self.next_counts[i])) for i in candidates]
+        max_exact = max(exact)
+
+        return self.choose(candidates[[v == max_exact for v in exact]])
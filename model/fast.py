@@ -0,0 +1,179 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import concurrent.futures
+import numpy as np
+
+from . import model
+from . import lookahead
+
+
+# Payoff tables already computed (within a process)
+_payoffs = {}
+
+# Threads shared by the models of a process, by number of threads
+_executors = {}
+
+
+def cached_keys():
+
+    # Keys (see 'model.tables_key') of the payoff tables already computed
+    return list(_payoffs)
+
+
+class FastModel(model.Model):
+
+    """
+    Same model, but move rules read the column of the payoff table corresponding to the move of the opponent
+    instead of calling 'profits_given_position_and_price' for each strategy.
+    Values are computed with the same floating point operations as in 'Model', so that tie sets (hence the use of
+    the random stream) are identical (see 'differential').
+    With several threads, tables are computed and candidate moves are evaluated by chunks of strategies in
+    parallel (NumPy releases the GIL in array operations), which makes a single large run use several cores.
+    """
+
+    def __init__(self, param, n_threads=1):
+
+        super().__init__(param)
+
+        self.n_threads = n_threads
+
+        if n_threads > 1:
+            if n_threads not in _executors:
+                _executors[n_threads] = concurrent.futures.ThreadPoolExecutor(max_workers=n_threads)
+            self.executor = _executors[n_threads]
+
+            bounds = np.linspace(0, self.n_strategies, n_threads + 1).astype(int)
+            self.chunks = [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+        else:
+            self.executor = None
+            self.chunks = [slice(None)]
+
+        if self.tables_key not in _payoffs:
+            _payoffs[self.tables_key] = np.concatenate(
+                list(self.map(lambda chunk: self.compute_payoffs(rows=chunk))))
+
+        self.payoffs = _payoffs[self.tables_key]
+
+        rules = {
+
+            model.Move.max_profit: self.move_profit_based,
+            model.Move.max_diff: self.move_diff_based,
+            model.Move.equal_sharing: self.move_equal_sharing,
+            model.Move.strategic: self.move_profit_strategic_based,
+            model.Move.strategic_k: self.move_profit_strategic_k_based
+
+        }
+
+        self.moves = [rules.get(rule) if isinstance(rule, model.Move) else self.kernel_move(rule)
+                      for rule in self.rules]
+        self.move = self.moves[0]
+
+        if model.Move.strategic in self.rules:
+            self.lookahead = lookahead.get(self.tables_key, lambda: self.payoffs[:, :, 0])
+
+    def map(self, func):
+
+        """
+        Apply a function to each chunk of strategies, in threads if there are several.
+        :param func: Function of a chunk (slice) (callable)
+        :return: Results, in the order of chunks (iterable)
+        """
+
+        if self.executor is None:
+            return [func(chunk) for chunk in self.chunks]
+
+        return self.executor.map(func, self.chunks)
+
+    def best(self, values):
+
+        """
+        Moves of maximal value, values being computed chunk by chunk in threads.
+        :param values: Values of the moves of a chunk (callable)
+        :return: Moves of maximal value (np.array)
+        """
+
+        parts = list(self.map(values))
+        max_value = max(np.max(p) for p in parts)
+
+        return np.concatenate([
+            np.arange(self.n_strategies)[chunk][p == max_value] for chunk, p in zip(self.chunks, parts)])
+
+    def column(self, opp_move):
+
+        return self.payoffs[:, opp_move, :]
+
+    def move_profit_based(self, opp_move):
+
+        if self.executor is not None:
+            return self.choose(self.best(lambda chunk: self.payoffs[chunk, opp_move, 0]))
+
+        exp_profits = self.payoffs[:, opp_move, 0]
+
+        max_profits = max(exp_profits)
+
+        idx = np.flatnonzero(exp_profits == max_profits)
+
+        return self.choose(idx)
+
+    def move_diff_based(self, opp_move):
+
+        if self.executor is not None:
+            return self.choose(self.best(
+                lambda chunk: self.payoffs[chunk, opp_move, 0] - self.payoffs[chunk, opp_move, 1]))
+
+        exp_profits = self.payoffs[:, opp_move, :]
+
+        profits_differences = exp_profits[:, 0] - exp_profits[:, 1]
+        max_profits_difference = max(profits_differences)
+
+        idx = np.flatnonzero(profits_differences == max_profits_difference)
+
+        return self.choose(idx)
+
+    def move_profit_strategic_based(self, opp_move):
+
+        # Strategic is a lookahead of depth 2
+        idx = self.lookahead.choices(opp_move, 2, executor=self.executor, n_chunks=self.n_threads)
+
+        return self.choose(idx)
+
+    def move_profit_strategic_k_based(self, opp_move):
+
+        idx = self.lookahead.choices(opp_move, self.depth, executor=self.executor, n_chunks=self.n_threads)
+
+        return self.choose(idx)
+
+    def move_equal_sharing(self, opp_move):
+
+        if self.executor is not None:
+
+            # Maximal profits of both firms, then distance to them
+            max_profits = np.max(list(self.map(lambda chunk: np.max(self.payoffs[chunk, opp_move, :], axis=0))),
+                                 axis=0)
+            return self.choose(self.best(
+                lambda chunk: np.sum(self.payoffs[chunk, opp_move, :] - max_profits, axis=1)))
+
+        exp_profits = self.payoffs[:, opp_move, :]
+
+        max_profits = np.max(exp_profits, axis=0)
+        sum_diff = np.sum(exp_profits - max_profits, axis=1)
+
+        max_value = max(sum_diff)
+
+        idx = np.flatnonzero(sum_diff == max_value)
+
+        return self.choose(idx)
@@ -0,0 +1,127 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import numpy as np
+
+
+GEOMETRIES = "line", "grid"
+METRICS = "manhattan", "euclidean"
+
+
+def n_locations(n_positions, geometry):
+
+    # On a grid, 'n_positions' is the length of a side
+    return n_positions ** 2 if geometry == "grid" else n_positions
+
+
+def half_width(dy, radius, metric):
+
+    """
+    Half width of the row at vertical offset 'dy' of a disk of radius 'radius'.
+    """
+
+    if metric == "manhattan":
+        return radius - abs(dy)
+
+    elif metric == "euclidean":
+        return math.isqrt(radius ** 2 - dy ** 2)
+
+    else:
+        raise ValueError("Metric '{}' is not known.".format(metric))
+
+
+def grid_consumers(side, radius, metric):
+
+    """
+    Compute the number of captive and shared consumers for each combination of locations on a grid,
+    a consumer seeing every firm at a distance inferior or equal to 'radius'.
+    A consumer sees a firm iff the firm sees the consumer, so the shared consumers of locations a and b are the
+    intersection of the disks centered on a and b. For every a at once, this intersection is obtained for every b
+    by summing, row by row, intervals of the disk of a, using prefix sums along rows (O(side^4 * radius)
+    instead of O(side^6) for a direct count).
+    :param side: Number of positions on a side of the grid (int)
+    :param radius: Radius of the field of view, in positions (int)
+    :param metric: 'manhattan' or 'euclidean' (string)
+    :return: For each combination of locations, number of captive consumers of firm 0, of firm 1,
+    and shared consumers (np.array of dimension side**2, side**2, 3)
+    """
+
+    n = side ** 2
+
+    y, x = np.divmod(np.arange(n), side)
+
+    # Disk of each location: disk[a, y, x] is True if the consumer at (y, x) sees location a
+    dy = np.abs(y[:, None, None] - np.arange(side)[None, :, None])
+    dx = np.abs(x[:, None, None] - np.arange(side)[None, None, :])
+    if metric == "manhattan":
+        disk = dx + dy <= radius
+    else:
+        disk = dx ** 2 + dy ** 2 <= radius ** 2
+
+    # Prefix sums along rows (with a leading zero)
+    prefix = np.zeros((n, side, side + 1), dtype=np.int32)
+    np.cumsum(disk, axis=2, out=prefix[:, :, 1:])
+
+    # shared[a, yb, xb]: number of consumers seeing both a and b = (yb, xb)
+    shared = np.zeros((n, side, side), dtype=np.int32)
+
+    cols = np.arange(side)
+
+    for offset in range(-radius, radius + 1):
+
+        w = half_width(offset, radius, metric)
+
+        rows = np.arange(max(0, -offset), min(side, side - offset))  # Rows of b such that the row b + offset exists
+        low = np.clip(cols - w, 0, side)
+        high = np.clip(cols + w + 1, 0, side)
+
+        band = prefix[:, rows + offset, :]
+        shared[:, rows, :] += band[:, :, high] - band[:, :, low]
+
+    shared = shared.reshape(n, n)
+    size = disk.reshape(n, -1).sum(axis=1)
+
+    z = np.zeros((n, n, 3), dtype=int)
+    z[:, :, 0] = size[:, None] - shared
+    z[:, :, 1] = size[None, :] - shared
+    z[:, :, 2] = shared
+
+    return z
+
+
+# Consumers tables already computed (within a process), by geometry, metric, number of positions and radius
+# (and tables of shares of consumers seeing both firms, by prices and temperature, see 'model.shares_key')
+_cache = {}
+
+
+def cached_keys():
+
+    # Keys of the tables already computed (consumers tables, then tables of shares, see 'model.shares_key')
+    return list(_cache)
+
+
+def get(key, compute):
+
+    """
+    :param key: Identifier of the consumers table (hashable)
+    :param compute: Function computing the table if it is not already known (callable)
+    :return: Consumers table (np.array)
+    """
+
+    if key not in _cache:
+        _cache[key] = compute()
+
+    return _cache[key]
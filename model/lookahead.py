@@ -0,0 +1,143 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+class Lookahead:
+
+    """
+    k-step lookahead in the alternating-move game, solved by dynamic programming.
+
+    With P[i, j] the profit of a firm playing i against j, the value of playing i against j with depth d is
+        Q_d(i, j) = P[i, j] + T_d(i),
+    where the 'tail' T_d does not depend on j:
+        T_1(i) = 0,
+        T_d(i) = mean over k in R_{d-1}(i) of (P[i, k] + M_{d-2}(k))   (M_0 = 0),
+    with R_m(i) the moves maximizing Q_m(., i) for the opponent (its response to i)
+    and M_m(k) = max over l of Q_m(l, k) (the value of the best reply to k).
+    Depth 1 is 'max_profit', depth 2 is 'strategic'.
+
+    Tails, best replies and tie sets are memoized. The tables being symmetric, the active firm is not part of
+    the key: tie sets are memoized by (opponent move, depth).
+    Tails and best replies can be computed by chunks of strategies in threads: the executor is given by the caller,
+    as the object is shared by every model using the same tables (see 'get').
+    """
+
+    def __init__(self, payoffs):
+
+        """
+        :param payoffs: Profit of a firm given its move and the move of its opponent (np.array S x S)
+        """
+
+        self.payoffs = payoffs
+        self.n_strategies = len(payoffs)
+
+        self.tails = {1: np.zeros(self.n_strategies)}
+        self.best_replies = {0: np.zeros(self.n_strategies)}
+        self.tie_sets = {}
+
+    def map(self, func, executor=None, n_chunks=1):
+
+        # Apply 'func' to chunks of strategies (slices), in threads if an executor is given; results are concatenated
+        if executor is None or n_chunks < 2:
+            return func(slice(None))
+
+        bounds = np.linspace(0, self.n_strategies, n_chunks + 1).astype(int)
+        chunks = [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+        return np.concatenate(list(executor.map(func, chunks)))
+
+    def tail(self, depth, executor=None, n_chunks=1):
+
+        if depth not in self.tails:
+
+            tail_opp = self.tail(depth - 1, executor=executor, n_chunks=n_chunks)
+            best_reply = self.best_reply(depth - 2, executor=executor, n_chunks=n_chunks)
+
+            def rows(chunk):
+
+                # response[i, k] is True if k is a best response of the opponent to i
+                values_opp = self.payoffs.T[chunk] + tail_opp[None, :]
+                response = values_opp == values_opp.max(axis=1, keepdims=True)
+
+                values = self.payoffs[chunk] + best_reply[None, :]
+
+                # Mean of the values over the responses of each row. Rows are grouped by number of responses, so that
+                # the values selected in a group form an array whose rows are averaged with the same operations than
+                # 'np.mean' in 'Model.move_profit_strategic_based' (depth 2 gives identical values)
+                counts = response.sum(axis=1)
+                means = np.zeros(len(values))
+
+                for n in np.unique(counts):
+                    group = counts == n
+                    means[group] = np.mean(values[group][response[group]].reshape(-1, n), axis=1)
+
+                return means
+
+            self.tails[depth] = self.map(rows, executor=executor, n_chunks=n_chunks)
+
+        return self.tails[depth]
+
+    def best_reply(self, depth, executor=None, n_chunks=1):
+
+        if depth not in self.best_replies:
+
+            tail = self.tail(depth, executor=executor, n_chunks=n_chunks)
+            self.best_replies[depth] = self.map(
+                lambda chunk: np.max(self.payoffs[:, chunk] + tail[:, None], axis=0), executor=executor,
+                n_chunks=n_chunks)
+
+        return self.best_replies[depth]
+
+    def values(self, opp_move, depth, executor=None, n_chunks=1):
+        return self.payoffs[:, opp_move] + self.tail(depth, executor=executor, n_chunks=n_chunks)
+
+    def choices(self, opp_move, depth, executor=None, n_chunks=1):
+
+        """
+        :param opp_move: Move of the opponent (int)
+        :param depth: Number of half-steps considered (int)
+        :param executor: (Optional) Threads computing tails and best replies by chunks of strategies
+        ('concurrent.futures.Executor' object)
+        :param n_chunks: Number of chunks (int)
+        :return: Moves of maximal value (np.array)
+        """
+
+        key = (opp_move, depth)
+
+        if key not in self.tie_sets:
+            values = self.values(opp_move, depth, executor=executor, n_chunks=n_chunks)
+            self.tie_sets[key] = np.flatnonzero(values == max(values))
+
+        return self.tie_sets[key]
+
+
+# Shared by all the models (within a process) using the same tables
+_cache = {}
+
+
+def get(key, compute_payoffs):
+
+    """
+    :param key: Identifier of the tables (hashable)
+    :param compute_payoffs: Function computing the payoffs if they are not already known (callable)
+    :return: 'Lookahead' object
+    """
+
+    if key not in _cache:
+        _cache[key] = Lookahead(compute_payoffs())
+
+    return _cache[key]
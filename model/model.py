@@ -19,6 +19,11 @@ import itertools
 import backup
 import enum
 
+from . import lookahead
+from . import geometry
+from . import registry
+from . geometry import GEOMETRIES, METRICS
+
 
 class Move(enum.Enum):
 
@@ -26,6 +31,61 @@ class Move(enum.Enum):
     max_diff = enum.auto()
     strategic = enum.auto()
     equal_sharing = enum.auto()
+    strategic_k = enum.auto()
+    fictitious_play = enum.auto()
+    q_learning = enum.auto()
+
+
+# Rules whose firms carry a state, run by 'batched.BatchedModel'
+LEARNING = Move.fictitious_play, Move.q_learning
+
+
+def get_rule(name):
+
+    """
+    Rule from its name in a parameter file: a member of 'Move', or a rule registered in 'registry'.
+    :param name: Name of the rule (string)
+    :return: Rule ('Move' or string)
+    """
+
+    if name in Move.__members__:
+        return Move[name]
+
+    return registry.get(name).name
+
+
+def tables_key(param):
+
+    """
+    Identify the tables (consumers, payoffs) of a model, for sharing what is computed from them between models.
+    :param param: Parameters ('Parameters' object)
+    :return: Key (tuple)
+    """
+
+    return consumers_key(param) + (param.n_prices, param.p_min, param.p_max, param.temperature)
+
+
+def consumers_key(param):
+
+    """
+    Identify the consumers table of a model (it only depends on the geometry and on the radius in positions).
+    :param param: Parameters ('Parameters' object)
+    :return: Key (tuple)
+    """
+
+    return param.geometry, param.metric, param.n_positions, int(param.r * param.n_positions)
+
+
+def shares_key(param):
+
+    """
+    Identify the table of expected shares of the consumers seeing both firms (it only depends on the prices and on
+    the temperature of the choice of consumers).
+    :param param: Parameters ('Parameters' object)
+    :return: Key (tuple)
+    """
+
+    return "shares", param.n_prices, param.p_min, param.p_max, param.temperature
 
 
 class Model:
@@ -43,8 +103,14 @@ class Model:
         self.p_min = param.p_min
         self.p_max = param.p_max
 
+        self.geometry = param.geometry
+        self.metric = param.metric
+
+        # Number of locations a firm can choose (on a grid, 'n_positions' is the length of a side)
+        self.n_locations = geometry.n_locations(self.n_positions, self.geometry)
+
         self.strategies = np.array(
-            list(itertools.product(range(self.n_positions), range(self.n_prices))),
+            list(itertools.product(range(self.n_locations), range(self.n_prices))),
             dtype=int
         )
 
@@ -54,17 +120,40 @@ class Model:
         self.n_strategies = len(self.strategies)
         self.idx_strategies = np.arange(self.n_strategies)
 
-        # Prepare useful arrays
-        self.n_consumers = self.compute_n_consumers()
+        # Prepare useful arrays (shared between models with the same geometry and radius)
+        self.n_consumers = geometry.get(consumers_key(param), self.compute_n_consumers)
+
+        # Consumers seeing both firms buy from the cheaper one (temperature 0), or make a logit choice on prices
+        self.temperature = param.temperature
+        self.shares = geometry.get(shares_key(param), self.compute_shares) if self.temperature > 0 else None
 
-        self.move = {
+        self.tables_key = tables_key(param)
+
+        # Rule of each firm (firm 1 may have its own rule, e.g. in a tournament)
+        self.rules = self.parameters.move, self.parameters.opp_move or self.parameters.move
+
+        rules = {
 
             Move.max_profit: self.move_profit_based,
             Move.max_diff: self.move_diff_based,
             Move.equal_sharing: self.move_equal_sharing,
-            Move.strategic: self.move_profit_strategic_based
+            Move.strategic: self.move_profit_strategic_based,
+            Move.strategic_k: self.move_profit_strategic_k_based
+
+        }
 
-        }[self.parameters.move]
+        # None for learning rules (see 'run')
+        self.moves = [rules.get(rule) if isinstance(rule, Move) else self.kernel_move(rule) for rule in self.rules]
+        self.move = self.moves[0]
+
+        if Move.strategic_k in self.rules:
+            self.depth = param.depth
+            self.lookahead = lookahead.get(self.tables_key, lambda: self.compute_payoffs()[:, :, 0])
+
+        # What is needed, with the parameters, to replay the run (see 'replay.Replayer'):
+        # move of firm 1 before the first step and rank of the move chosen in each tie set
+        self.initial_move = None
+        self.tie_breaks = []
 
     def compute_n_consumers(self):
         
@@ -76,6 +165,10 @@ class Model:
         (np.array of dimension n_position, n_position, 3).  
         """
 
+        if self.geometry == "grid":
+            return geometry.grid_consumers(
+                side=self.n_positions, radius=int(self.r * self.n_positions), metric=self.metric)
+
         z = np.zeros((self.n_positions, self.n_positions, 3), dtype=int)
         # Last parameter is idx0: n consumers seeing only A,
         #                   idx1: n consumers seeing only B,
@@ -106,6 +199,68 @@ class Model:
 
         return z
 
+    def compute_shares(self):
+
+        """
+        Compute the expected share of the consumers seeing both firms that buy from a firm, given its price and the
+        price of its opponent, each consumer choosing a firm with probability proportional to exp(-price / temperature).
+        :return: Share given the idx of the price of the firm and the idx of the price of its opponent
+        (np.array of dimension n_prices, n_prices)
+        """
+
+        # 1 / (1 + exp(x)) written with tanh: no overflow for low temperatures, and exactly 1/2 on equal prices
+        x = (self.prices[:, None] - self.prices[None, :]) / self.temperature
+        return 0.5 * (1 - np.tanh(x / 2))
+
+    def compute_payoffs(self, n_consumers=None, rows=slice(None)):
+
+        """
+        Compute the profits of both firms for every combination of moves
+        (same values than 'profits_given_position_and_price').
+        :param n_consumers: (Optional) Output of 'compute_consumers_given_moves'
+        :param rows: (Optional) Moves of firm 0 to consider, all by default (slice)
+        :return: Profits of firm 0 and firm 1 given move of firm 0 and move of firm 1
+        (np.array of dimension n_strategies, n_strategies, 2)
+        """
+
+        if n_consumers is None:
+            n_consumers = self.compute_consumers_given_moves(rows=rows)
+
+        price = self.prices[self.strategies[:, 1]]
+
+        return n_consumers * np.stack(np.broadcast_arrays(price[rows, None], price[None, :]), axis=-1)
+
+    def compute_consumers_given_moves(self, rows=slice(None)):
+
+        """
+        Compute the number of consumers of both firms for every combination of moves
+        (same values than 'get_n_consumers_given_moves').
+        :param rows: (Optional) Moves of firm 0 to consider, all by default (slice)
+        :return: Number of expected consumers of firm 0 and firm 1 given move of firm 0 and move of firm 1
+        (np.array of dimension n_strategies, n_strategies, 2)
+        """
+
+        pos = self.strategies[:, 0]
+        price = self.strategies[:, 1]
+
+        n_consumers = np.zeros((len(pos[rows]), self.n_strategies, 2))
+        n_consumers[:] = self.n_consumers[pos[rows, None], pos[None, :], :2]
+
+        to_share = self.n_consumers[pos[rows, None], pos[None, :], 2]
+
+        if self.shares is not None:
+            n_consumers[:, :, 0] += to_share * self.shares[price[rows, None], price[None, :]]
+            n_consumers[:, :, 1] += to_share * self.shares[price[None, :], price[rows, None]]
+            return n_consumers
+
+        equal = price[rows, None] == price[None, :]
+        cheaper = price[rows, None] < price[None, :]
+
+        n_consumers[:, :, 0] += np.where(equal, to_share / 2, np.where(cheaper, to_share, 0))
+        n_consumers[:, :, 1] += np.where(equal, to_share / 2, np.where(cheaper | equal, 0, to_share))
+
+        return n_consumers
+
     def field_of_view(self, x):
         
         """
@@ -145,6 +300,7 @@ class Model:
         """
         Given moves of the two firms, compute the number of consumers for the two firms.
         NB: Could be half of consumer as it has to be interpreted more as the expected number as the actual number.
+        With a positive temperature, consumers seeing both firms are shared according to 'shares'.
         :param move0: Move of firm 0 (int)
         :param move1: Move of firm 1 (int)
         :return: Number of expected consumers for both firms (np.array of length 2)
@@ -160,7 +316,10 @@ class Model:
 
         if to_share > 0:
 
-            if price0 == price1:
+            if self.shares is not None:
+                n_consumers[:] += to_share * self.shares[(price0, price1), (price1, price0)]
+
+            elif price0 == price1:
                 n_consumers[:] += to_share / 2
 
             else:
@@ -168,6 +327,61 @@ class Model:
 
         return n_consumers
 
+    def choose(self, idx):
+
+        """
+        Choose uniformly one of several equally good moves, recording its rank when there is a tie.
+        :param idx: Moves of maximal value, sorted (np.array)
+        :return: Selected move (int)
+        """
+
+        i = np.random.choice(idx)
+
+        if len(idx) > 1:
+            self.tie_breaks.append(np.searchsorted(idx, i))
+
+        return i
+
+    def draw_initial_move(self):
+
+        self.initial_move = np.random.randint(low=0, high=self.n_strategies)
+        return self.initial_move
+
+    def column(self, opp_move):
+
+        """
+        Profits of both firms for each move of the firm, given the move of its opponent.
+        :param opp_move: Move of the opponent (int)
+        :return: Profits (np.array n_strategies x 2)
+        """
+
+        exp_profits = np.zeros((self.n_strategies, 2))
+
+        for i in range(self.n_strategies):
+            exp_profits[i] = self.profits_given_position_and_price(i, opp_move)
+
+        return exp_profits
+
+    def kernel_move(self, name):
+
+        """
+        Move function of a firm using a registered rule (see 'registry'), the firm keeping its own state.
+        :param name: Name of the rule (string)
+        :return: Move function (callable)
+        """
+
+        rule = registry.get(name)
+        state = registry.init_state(rule, self.n_strategies)
+
+        def move(opp_move):
+
+            state["opp_move"] = opp_move
+            scores = rule.kernel(self.column(opp_move), state, np.random)
+
+            return self.choose(np.flatnonzero(scores == np.max(scores)))
+
+        return move
+
     def move_profit_based(self, opp_move):
 
         """
@@ -185,9 +399,7 @@ class Model:
 
         idx = np.flatnonzero(exp_profits == max_profits)
 
-        i = np.random.choice(idx)
-
-        return i
+        return self.choose(idx)
 
     def move_diff_based(self, opp_move):
 
@@ -202,7 +414,7 @@ class Model:
         # noinspection PyTypeChecker
         idx = np.flatnonzero(profits_differences == max_profits_difference)
 
-        return np.random.choice(idx)
+        return self.choose(idx)
 
     def move_profit_strategic_based(self, opp_move):
 
@@ -223,7 +435,20 @@ class Model:
 
         idx = np.flatnonzero(values == max_value)
 
-        return np.random.choice(idx)
+        return self.choose(idx)
+
+    def move_profit_strategic_k_based(self, opp_move):
+
+        """
+        Select the move that gives the maximum profit over the next 'depth' half-steps,
+        the opponent anticipating in the same way (see 'lookahead.Lookahead').
+        :param opp_move: Move of the opponent (int)
+        :return: Selected move (int)
+        """
+
+        idx = self.lookahead.choices(opp_move, self.depth)
+
+        return self.choose(idx)
 
     def move_equal_sharing(self, opp_move):
 
@@ -239,7 +464,7 @@ class Model:
 
         idx = np.flatnonzero(sum_diff == max_value)
 
-        return np.random.choice(idx)
+        return self.choose(idx)
 
     def run(self):
         
@@ -247,7 +472,12 @@ class Model:
         Run simulation of an economy.
         :return: A backup (arbitrary Python object)
         """
-        
+
+        if self.parameters.move in LEARNING:
+            # Learning firms carry a state: they are handled by the batched engine (here with a batch of one)
+            from . import batched
+            return batched.BatchedModel([self.parameters]).run()[0]
+
         # For recording
         positions = np.zeros((self.t_max, 2), dtype=int)
         prices = np.zeros((self.t_max, 2))
@@ -258,13 +488,13 @@ class Model:
 
         active = 0
 
-        moves[:] = -99, np.random.randint(low=0, high=self.n_prices * self.n_positions)
+        moves[:] = -99, self.draw_initial_move()
 
         for t in range(self.t_max):
 
             passive = (active + 1) % 2  # Get passive id
 
-            moves[active] = self.move(moves[passive])  # Make play active firm
+            moves[active] = self.moves[active](moves[passive])  # Make play active firm
 
             move0, move1 = moves  # Useful for call of functions
 
@@ -277,5 +507,10 @@ class Model:
 
             active = passive  # Inverse role
 
+        # Kernels of registered rules may draw random numbers, which tie breaks do not record: no replay for them
+        replayable = not any(registry.is_registered(rule) for rule in self.rules)
+
         return backup.RunBackup(
-            parameters=self.parameters, positions=positions, prices=prices, profits=profits, n_consumers=n_consumers)
+            parameters=self.parameters, positions=positions, prices=prices, profits=profits, n_consumers=n_consumers,
+            initial_move=self.initial_move,
+            tie_breaks=np.array(self.tie_breaks, dtype=np.min_scalar_type(self.n_strategies)) if replayable else None)
@@ -0,0 +1,102 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import numpy as np
+
+
+# A rule defined by a kernel: 'kernel(column, state, rng)' gives a score to each move, the firm choosing uniformly
+# one of the moves of maximal score. 'column' is the column of the payoff table for the move of the opponent
+# (np.array n_strategies x 2: profits of the firm and of its opponent), with a leading batch axis when several runs
+# are simulated at once (np.array n_runs x n_strategies x 2), and so are the scores. 'state' is a dictionary kept
+# between the moves of the firm ('opp_move' is set to the move(s) of the opponent before each call), created by
+# 'init(n_strategies, batch_shape)' (empty if there is no 'init'). 'rng' draws random numbers with
+# 'random_sample(size)', 'size' including the batch axis.
+Rule = collections.namedtuple("Rule", ["name", "kernel", "init"])
+
+_registry = {}
+
+
+def register(name, init=None):
+
+    """
+    Register a rule under a name, which can then be used as 'move' (or 'opp_move') in parameter files.
+    Usable as a decorator:
+
+        @registry.register("min_price")
+        def min_price(column, state, rng):
+            return -column[..., 1]
+
+    :param name: Name of the rule (string)
+    :param init: (Optional) Function giving the initial state of a firm (callable)
+    :return: Decorator registering a kernel (callable)
+    """
+
+    def decorator(kernel):
+        _registry[name] = Rule(name=name, kernel=kernel, init=init)
+        return kernel
+
+    return decorator
+
+
+def get(name):
+
+    assert name in _registry, "'{}' is not a registered rule (registered: {}).".format(name, ", ".join(names()))
+    return _registry[name]
+
+
+def is_registered(name):
+
+    return isinstance(name, str) and name in _registry
+
+
+def names():
+
+    return sorted(_registry)
+
+
+def init_state(rule, n_strategies, batch_shape=()):
+
+    """
+    Initial state of a firm using a rule.
+    :param rule: Rule ('Rule' object)
+    :param n_strategies: Number of moves (int)
+    :param batch_shape: Shape of the batch axis, empty for a single run (tuple)
+    :return: State (dictionary)
+    """
+
+    return rule.init(n_strategies, batch_shape) if rule.init is not None else {}
+
+
+class BatchRandomState:
+
+    """
+    Random numbers for a batch of runs, each row being drawn from the random stream of its run
+    (same interface as 'np.random' for kernels).
+    """
+
+    def __init__(self, rngs):
+
+        self.rngs = rngs
+
+    def random_sample(self, size):
+
+        """
+        :param size: Shape of the array, starting with the batch axis (tuple)
+        :return: Uniform random numbers (np.array)
+        """
+
+        assert size[0] == len(self.rngs), "'size' have to start with the number of runs."
+        return np.array([rng.random_sample(size[1:]) for rng in self.rngs])
@@ -0,0 +1,55 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import fast
+
+
+class Replayer(fast.FastModel):
+
+    """
+    Regenerate a run from its parameters, the move of firm 1 before the first step and the rank of the move
+    chosen in each tie set: no random number is drawn, the recorded choices are used instead.
+    """
+
+    def __init__(self, param, initial_move, tie_breaks):
+
+        """
+        :param param: Parameters ('Parameters' object)
+        :param initial_move: Move of firm 1 before the first step (int)
+        :param tie_breaks: Rank of the move chosen in each tie set, in order (array-like of int)
+        """
+
+        assert param.move not in fast.model.LEARNING, "Runs of learning firms cannot be replayed."
+        assert not any(fast.model.registry.is_registered(rule) for rule in (param.move, param.opp_move)), \
+            "Runs of firms using registered rules cannot be replayed (their kernels may draw random numbers)."
+
+        super().__init__(param)
+
+        self.recorded_initial_move = initial_move
+        self.recorded_tie_breaks = iter(tie_breaks)
+
+    def choose(self, idx):
+
+        if len(idx) > 1:
+            rank = next(self.recorded_tie_breaks)
+            self.tie_breaks.append(rank)
+            return idx[rank]
+
+        return idx[0]
+
+    def draw_initial_move(self):
+
+        self.initial_move = self.recorded_initial_move
+        return self.initial_move
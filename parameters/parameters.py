@@ -23,7 +23,8 @@ from model import model
 class Parameters:
 
     def __init__(self, r=0.5, seed=0, n_positions=20, n_prices=10, p_min=1, p_max=2, t_max=25,
-                 move=model.Move.max_profit):
+                 move=model.Move.max_profit, depth=2, alpha=0.1, epsilon=0.1, geometry="line", metric="euclidean",
+                 opp_move=None, temperature=0):
 
         self.r = r
         self.seed = seed
@@ -38,6 +39,23 @@ class Parameters:
 
         self.move = move
 
+        # Rule of firm 1 when it differs from the one of firm 0 (None: both firms use 'move')
+        self.opp_move = opp_move
+
+        # Number of half-steps considered by 'strategic_k' firms
+        self.depth = depth
+
+        # Learning rate and exploration rate of 'q_learning' firms
+        self.alpha = alpha
+        self.epsilon = epsilon
+
+        # 'line' or 'grid' (then 'n_positions' is the length of a side and distances follow 'metric')
+        self.geometry = geometry
+        self.metric = metric
+
+        # Noise in the choice of consumers seeing both firms between their prices (0: the cheaper firm is chosen)
+        self.temperature = temperature
+
         self.check()
 
     def check(self):
@@ -48,10 +66,23 @@ class Parameters:
         assert self.t_max > 2, "'t_max' have to be superior to 2."
         assert 0 < self.seed < 2**32-1, "'seed' have to be comprised between 0 and 2^32 - 1."
         assert 0 < self.r <= 1, "'r' have to be comprised between 0 and 1."
+        assert self.depth >= 1, "'depth' have to be superior or equal to 1."
+        assert 0 <= self.alpha <= 1, "'alpha' have to be comprised between 0 and 1."
+        assert 0 <= self.epsilon <= 1, "'epsilon' have to be comprised between 0 and 1."
+        assert self.geometry in model.GEOMETRIES, "'geometry' have to be one of {}.".format(model.GEOMETRIES)
+        assert self.temperature >= 0, "'temperature' have to be superior or equal to 0."
+        assert self.metric in model.METRICS, "'metric' have to be one of {}.".format(model.METRICS)
+        assert all(isinstance(m, model.Move) or model.registry.is_registered(m) for m in (self.move, self.opp_move)
+                   if m is not None), "'move' have to be a member of 'Move' or a registered rule."
+        assert self.opp_move in (None, self.move) or \
+            (self.move not in model.LEARNING and self.opp_move not in model.LEARNING), \
+            "'move' and 'opp_move' have to be the same for learning rules."
 
     def dict(self):
         dic = {i: j for i, j in self.__dict__.items() if not i.startswith("__")}
         dic["move"] = str(dic["move"]).replace("Move.", "")
+        if dic.get("opp_move") is not None:
+            dic["opp_move"] = str(dic["opp_move"]).replace("Move.", "")
         return dic
 
 
@@ -68,32 +99,28 @@ def load(json_file):
 
 def extract_parameters(j_param):
 
+    # Parameters shared by all the runs; optional ones take their default value if absent
+    common = dict(
+        p_min=j_param["p_min"],
+        p_max=j_param["p_max"],
+        n_prices=j_param["n_prices"],
+        n_positions=j_param["n_positions"],
+        t_max=j_param["t_max"],
+        move=model.get_rule(j_param["move"]),
+        **{k: j_param[k] for k in ("depth", "alpha", "epsilon", "geometry", "metric", "temperature") if k in j_param}
+    )
+
+    if j_param.get("opp_move") is not None:
+        common["opp_move"] = model.get_rule(j_param["opp_move"])
+
     if type(j_param["seed"]) == list:
         return [
-            Parameters(
-                p_min=j_param["p_min"],
-                p_max=j_param["p_max"],
-                n_prices=j_param["n_prices"],
-                n_positions=j_param["n_positions"],
-                t_max=j_param["t_max"],
-                r=j_param["r"][i],
-                seed=j_param["seed"][i],
-                move=getattr(model.Move, j_param["move"])
-            )
+            Parameters(r=j_param["r"][i], seed=j_param["seed"][i], **common)
             for i in range(len(j_param["r"]))
         ]
 
     else:
-        return Parameters(
-                p_min=j_param["p_min"],
-                p_max=j_param["p_max"],
-                n_prices=j_param["n_prices"],
-                n_positions=j_param["n_positions"],
-                t_max=j_param["t_max"],
-                r=j_param["r"],
-                seed=j_param["seed"],
-                move=getattr(model.Move, j_param["move"])
-        )
+        return Parameters(r=j_param["r"], seed=j_param["seed"], **common)
 
 
 def generate_new_parameters_files():
@@ -0,0 +1,195 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+
+
+class Task:
+
+    def __init__(self, name, func, kwargs, inputs, outputs, deps, executor, force):
+
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.executor = executor
+        self.force = force
+
+
+class Pipeline:
+
+    """
+    Tasks (producing data or figures) linked by their dependencies and executed concurrently, make-style:
+    a task whose outputs exist and whose inputs (files and arguments) have the same content hash as when it
+    was last executed is skipped.
+    """
+
+    def __init__(self, state_file="data/pipeline.json", max_workers=None, initializer=None):
+
+        """
+        :param state_file: Where the hashes of the inputs of the tasks already executed are kept (string)
+        :param max_workers: (Optional) Maximal number of tasks executed simultaneously by each executor (int)
+        :param initializer: (Optional) Function called at the start of each worker process (callable)
+        """
+
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.initializer = initializer
+
+        self.tasks = {}
+
+        if os.path.exists(state_file):
+            with open(state_file, "r") as f:
+                self.state = json.load(f)
+        else:
+            self.state = {}
+
+        self.executed = []
+        self.skipped = []
+
+    def add(self, name, func, kwargs=None, inputs=(), outputs=(), deps=(), executor="process", force=False):
+
+        """
+        Add a task (if a task with the same name already exists, it is kept as it is).
+        :param name: Unique name of the task (string)
+        :param func: Function executed (has to be picklable if executed in a process) (callable)
+        :param kwargs: (Optional) Keyword arguments of the function (dictionary)
+        :param inputs: Files (or directories) read by the task (outputs of its dependencies are added automatically)
+        (iterable)
+        :param outputs: Files (or directories) written by the task (iterable)
+        :param deps: Names of the tasks that have to be executed before (iterable)
+        :param executor: 'thread' for tasks managing their own pool of processes, 'process' otherwise (string)
+        :param force: If True, the task is executed even if it is up to date (bool)
+        :return: Name of the task (string)
+        """
+
+        if name in self.tasks:
+            return name
+
+        for d in deps:
+            assert d in self.tasks, "Dependency '{}' of '{}' has to be added first.".format(d, name)
+
+        inputs = list(inputs) + [o for d in deps for o in self.tasks[d].outputs]
+
+        self.tasks[name] = Task(
+            name=name, func=func, kwargs=kwargs or {}, inputs=inputs, outputs=outputs, deps=deps,
+            executor=executor, force=force)
+
+        return name
+
+    def hash(self, task):
+
+        h = hashlib.sha256()
+        h.update(task.name.encode())
+        h.update(json.dumps(task.kwargs, sort_keys=True, default=repr).encode())
+
+        for path in sorted(task.inputs):
+
+            h.update(path.encode())
+
+            if not os.path.exists(path):
+                h.update(b"missing")
+                continue
+
+            for file_path in self.files(path):
+
+                h.update(os.path.relpath(file_path, path).encode())
+
+                with open(file_path, "rb") as f:
+                    for chunk in iter(functools.partial(f.read, 2**20), b""):
+                        h.update(chunk)
+
+        return h.hexdigest()
+
+    @staticmethod
+    def files(path):
+
+        """
+        :param path: Path to a file or a directory (string)
+        :return: The file itself, or every file of the directory, in a fixed order (list)
+        """
+
+        if not os.path.isdir(path):
+            return [path]
+
+        return sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+
+    def up_to_date(self, task, h):
+
+        if task.force or not all(os.path.exists(o) for o in task.outputs):
+            return False
+
+        # Outputs produced before the pipeline kept track of them are trusted (as they were by 'main.py')
+        return self.state.get(task.name, h) == h
+
+    def save_state(self):
+
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+
+        with open(self.state_file, "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+
+    async def execute_task(self, task, futures, executors):
+
+        await asyncio.gather(*(futures[d] for d in task.deps))
+
+        h = self.hash(task)
+
+        if self.up_to_date(task, h):
+            self.skipped.append(task.name)
+
+        else:
+            await asyncio.get_running_loop().run_in_executor(
+                executors[task.executor], functools.partial(task.func, **task.kwargs))
+            self.executed.append(task.name)
+
+            # Hash again: a task may create its own inputs (e.g. parameters files generated when missing)
+            h = self.hash(task)
+
+        self.state[task.name] = h
+        self.save_state()
+
+    async def execute(self):
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool_tasks, \
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=self.initializer) as processes:
+
+            # Tasks executed in threads manage their own pool of processes, using every core: one at a time
+            executors = {"thread": pool_tasks, "process": processes}
+
+            futures = {}
+            for name, task in self.tasks.items():  # Dependencies are always added before the tasks needing them
+                futures[name] = asyncio.ensure_future(self.execute_task(task, futures, executors))
+
+            await asyncio.gather(*futures.values())
+
+    def run(self):
+
+        """
+        Execute the tasks that are not up to date.
+        :return: Names of the tasks executed and names of the tasks skipped (tuple of lists)
+        """
+
+        asyncio.run(self.execute())
+
+        return self.executed, self.skipped
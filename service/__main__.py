@@ -0,0 +1,28 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+
+from . server import serve
+
+
+parser = argparse.ArgumentParser(description='Serve simulations (POST /run, GET /status).')
+parser.add_argument('--host', default="127.0.0.1")
+parser.add_argument('--port', type=int, default=8765)
+parser.add_argument('--cache_size', type=int, default=1000,
+                    help="Number of results kept in memory")
+parsed_args = parser.parse_args()
+
+serve(host=parsed_args.host, port=parsed_args.port, cache_size=parsed_args.cache_size)
@@ -0,0 +1,173 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import http.server
+import json
+import time
+
+import backup
+import model
+import parameters
+
+
+# Used for the entries missing in a request (same values as in 'parameters.generate_new_parameters_files')
+DEFAULTS = {
+    "p_min": 1,
+    "p_max": 11,
+    "n_prices": 11,
+    "n_positions": 21,
+    "t_max": 25,
+    "seed": 1,
+    "move": "max_profit"
+}
+
+
+class SimulationService:
+
+    """
+    Answer simulation requests, keeping tables (consumers, payoffs, lookahead) and results in memory
+    between requests.
+    """
+
+    def __init__(self, cache_size=1000):
+
+        self.cache_size = cache_size
+        self.results = collections.OrderedDict()
+
+        self.n_requests = 0
+        self.n_hits = 0
+
+    def simulate(self, request):
+
+        """
+        :param request: Parameters of the run, as in a parameters file; missing entries take default values (dict)
+        :return: Backup of the run ('RunBackup' object)
+        """
+
+        j_param = dict(DEFAULTS, **{k: v for k, v in request.items() if k not in ("trajectories", "span")})
+        key = json.dumps(j_param, sort_keys=True)
+
+        self.n_requests += 1
+
+        if key in self.results:
+            self.n_hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+
+        param = parameters.extract_parameters(j_param)
+
+        engine = model.Model if param.move in model.LEARNING else model.FastModel
+        bkp = engine(param).run()
+
+        self.results[key] = bkp
+        if len(self.results) > self.cache_size:
+            self.results.popitem(last=False)
+
+        return bkp
+
+    def answer(self, request):
+
+        """
+        :param request: Parameters of the run, plus optionally 'trajectories' (bool), for getting the records,
+        and 'span' (int), for getting only the last time steps (dict)
+        :return: Summary of the run and, if requested, its records (dict)
+        """
+
+        t0 = time.perf_counter()
+
+        bkp = self.simulate(request)
+
+        answer = {"summary": backup.summarize(bkp), "parameters": bkp.parameters.dict()}
+
+        if request.get("trajectories", False):
+            span = request.get("span", bkp.parameters.t_max)
+            for k in ("positions", "prices", "n_consumers", "profits"):
+                answer[k] = getattr(bkp, k)[-span:].tolist()
+
+        answer["duration"] = time.perf_counter() - t0
+
+        return answer
+
+    def status(self):
+
+        return {
+            "requests": self.n_requests,
+            "cache_hits": self.n_hits,
+            "cached_results": len(self.results),
+            "cached_consumers_tables": sum(k[0] != "shares" for k in model.geometry.cached_keys()),
+            "cached_shares_tables": sum(k[0] == "shares" for k in model.geometry.cached_keys()),
+            "cached_payoffs_tables": len(model.fast.cached_keys())
+        }
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+    """
+    POST /run with the parameters of a run (JSON) for a summary (and the records if 'trajectories' is true);
+    GET /status for the state of the caches.
+    """
+
+    service = None
+
+    def send(self, code, content):
+
+        body = json.dumps(content).encode()
+
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+
+        if self.path == "/status":
+            self.send(200, self.service.status())
+        else:
+            self.send(404, {"error": "Unknown path '{}'.".format(self.path)})
+
+    def do_POST(self):
+
+        if self.path != "/run":
+            self.send(404, {"error": "Unknown path '{}'.".format(self.path)})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self.send(200, self.service.answer(request))
+
+        except (AssertionError, AttributeError, KeyError, TypeError, ValueError) as e:
+            self.send(400, {"error": "{}: {}".format(type(e).__name__, e)})
+
+
+def serve(host="127.0.0.1", port=8765, cache_size=1000):
+
+    """
+    Run the service until interrupted.
+    Requests are answered one after the other (simulations use the global random stream).
+    """
+
+    Handler.service = SimulationService(cache_size=cache_size)
+
+    server = http.server.HTTPServer((host, port), Handler)
+    print("Serving simulations on http://{}:{}".format(host, port))
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        server.server_close()
+
@@ -0,0 +1,2 @@
+from . adaptive import adaptive_sweep
+from . sequential import sequential_sweep, half_width
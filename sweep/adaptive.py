@@ -0,0 +1,160 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import tqdm
+
+import backup
+import parameters
+
+
+METRICS = "distance", "price", "profit"
+
+
+def scale(json_parameters):
+
+    # Typical magnitude of each metric, so that they weigh the same
+    return {
+        "distance": 1,
+        "price": json_parameters["p_max"] - json_parameters["p_min"],
+        "profit": json_parameters["p_max"] * json_parameters["n_positions"]
+    }
+
+
+def effective_radius(r, n_positions):
+
+    # Only the radius in number of positions matters for the model (see 'Model.field_of_view')
+    return int(r * n_positions)
+
+
+def radius(effective, n_positions):
+
+    # Middle of the interval of 'r' values sharing the same effective radius
+    return min((effective + 0.5) / n_positions, 1.)
+
+
+def adaptive_sweep(json_parameters, data_file, run, pool, n_runs=250, n_coarse=8, n_seeds_init=3, batch_size=32,
+                   seed=None, catalog=None):
+
+    """
+    Produce pooled data by allocating runs where they reduce the most the uncertainty on the 'distance',
+    'price' and 'profit' curves, instead of drawing 'r' uniformly.
+    Starts from a coarse grid of effective radii, then, round after round, either adds seeds to radii with a high
+    variance or refines the grid between neighbouring radii whose outcomes differ the most.
+    :param json_parameters: Parameters of the pool; 'r' and 'seed' entries are ignored (dictionary)
+    :param data_file: Path to the future data file (string)
+    :param run: Function running a simulation given a 'Parameters' object (callable)
+    :param pool: Pool of workers (multiprocessing.Pool)
+    :param n_runs: Total number of simulations (int)
+    :param n_coarse: Number of effective radii of the initial grid (int)
+    :param n_seeds_init: Number of seeds for each newly explored radius (int)
+    :param batch_size: Number of simulations dispatched at each round (int)
+    :param seed: (Optional) Seed for drawing the seeds of the simulations (int)
+    :param catalog: (Optional) Catalog indexing each run as it is written ('backup.Catalog' object)
+    :return: a 'pool backup' ('IndexedPoolBackup' object)
+    """
+
+    rng = np.random.RandomState(seed)
+
+    n_positions = json_parameters["n_positions"]
+
+    metric_scale = np.array([scale(json_parameters)[m] for m in METRICS])
+
+    samples = {}
+
+    to_run = [e for e in np.unique(np.linspace(0, n_positions, n_coarse).astype(int)) for _ in range(n_seeds_init)]
+
+    with backup.PoolWriter(parameters=json_parameters, data_file=data_file, catalog=catalog) as writer, \
+            tqdm.tqdm(total=n_runs) as progress:
+
+        while to_run:
+
+            pool_parameters = [
+                parameters.extract_parameters(dict(
+                    json_parameters,
+                    r=radius(e, n_positions),
+                    seed=int(rng.randint(low=1, high=2**32-1))))
+                for e in to_run
+            ]
+
+            for bkp in pool.imap_unordered(run, pool_parameters):
+
+                writer.write(bkp)
+
+                summary = backup.summarize(bkp)
+                samples.setdefault(effective_radius(bkp.parameters.r, n_positions), []).append(
+                    np.array([summary[m] for m in METRICS]) / metric_scale)
+
+                progress.update()
+
+            to_run = allocate(samples, n=min(batch_size, n_runs - len(writer.offsets)), n_seeds_init=n_seeds_init)
+
+        writer.parameters = dict(json_parameters, r=writer.r, seed=writer.seed)
+
+    return backup.IndexedPoolBackup(data_file)
+
+
+def allocate(samples, n, n_seeds_init):
+
+    """
+    Choose the next simulations to run.
+    Adding a seed to radius 'e' reduces the squared standard error of its mean by var / (n (n + 1));
+    exploring the middle of a gap between two explored radii is worth the squared half-difference of their means
+    (a small term proportional to the width of the gap breaks ties in favour of large unexplored regions).
+    :param samples: Normalized outcomes of the runs already done for each effective radius (dictionary)
+    :param n: Number of simulations to allocate (int)
+    :param n_seeds_init: Number of seeds for each newly explored radius (int)
+    :return: Effective radii of the simulations to run (list)
+    """
+
+    if n <= 0:
+        return []
+
+    explored = sorted(samples.keys())
+
+    mean = {e: np.mean(samples[e], axis=0) for e in explored}
+    var = {e: np.sum(np.var(samples[e], axis=0, ddof=1)) for e in explored if len(samples[e]) > 1}
+
+    # Radii with a single run borrow the typical variance of the others
+    default_var = np.median(list(var.values())) if var else 1.
+    n_seeds = {e: len(samples[e]) for e in explored}
+
+    def seed_value(e):
+        return var.get(e, default_var) / (n_seeds[e] * (n_seeds[e] + 1))
+
+    gaps = [
+        (np.sum((mean[b] - mean[a]) ** 2) / 4 + 1e-6 * (b - a), (a + b) // 2)
+        for a, b in zip(explored[:-1], explored[1:]) if b - a > 1
+    ]
+    gaps.sort(reverse=True)
+
+    to_run = []
+
+    while len(to_run) < n:
+
+        best_seed = max(explored, key=seed_value)
+
+        if gaps and gaps[0][0] / n_seeds_init >= seed_value(best_seed):
+            _, e = gaps.pop(0)
+            to_run += [e, ] * min(n_seeds_init, n - len(to_run))
+
+        elif seed_value(best_seed) > 0:
+            to_run.append(best_seed)
+            n_seeds[best_seed] += 1
+
+        else:
+            break
+
+    return to_run
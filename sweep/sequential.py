@@ -0,0 +1,158 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import statistics
+import collections
+import numpy as np
+import tqdm
+
+import backup
+import telemetry
+
+from . adaptive import METRICS, effective_radius, scale
+
+
+def half_width(x, method="clt", level=0.95, n_boot=2000, rng=np.random):
+
+    """
+    Half width of the confidence interval of the mean.
+    :param x: Observations (np.array)
+    :param method: 'clt' (normal approximation) or 'bootstrap' (percentile bootstrap) (string)
+    :param level: Confidence level (float)
+    :param n_boot: Number of bootstrap resamples (int)
+    :param rng: Random number generator used for bootstrap (np.random.RandomState)
+    :return: Half width (float)
+    """
+
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+
+    if n < 2:
+        return np.inf
+
+    if method == "clt":
+        z = statistics.NormalDist().inv_cdf(0.5 + level / 2)
+        return z * np.std(x, ddof=1) / np.sqrt(n)
+
+    elif method == "bootstrap":
+        means = x[rng.randint(low=0, high=n, size=(n_boot, n))].mean(axis=1)
+        low, high = np.percentile(means, [100 * (1 - level) / 2, 100 * (1 + level) / 2])
+        return (high - low) / 2
+
+    else:
+        raise ValueError("Method '{}' is not known.".format(method))
+
+
+def _finite(x):
+
+    # Half widths are infinite with less than 2 runs: None in JSON (which has no infinity)
+    return float(x) if np.isfinite(x) else None
+
+
+def sequential_sweep(json_parameters, pool_parameters, data_file, run, pool, tolerance, method="clt",
+                     min_runs=5, step=5, monitor=None, catalog=None):
+
+    """
+    Run the seeds of each configuration (runs sharing the same effective radius) only until the confidence
+    intervals of mean distance, price and profit are narrow enough.
+    The seeds given in parameters are a budget: they are used in order, by waves of 'step' seeds
+    for each configuration that did not converge yet.
+    :param json_parameters: Parameters of the pool (dictionary)
+    :param pool_parameters: Parameters of every run of the budget (list of 'Parameters' objects)
+    :param data_file: Path to the future data file (string)
+    :param run: Function running a simulation given a 'Parameters' object (callable)
+    :param pool: Pool of workers (multiprocessing.Pool)
+    :param tolerance: Maximal half width of the confidence intervals, relative to the scale of each metric
+    (see 'scale') (float)
+    :param method: 'clt' or 'bootstrap' (string)
+    :param min_runs: Number of runs before testing convergence (int)
+    :param step: Number of runs added at each wave for each configuration (int)
+    :param monitor: (Optional) Telemetry of the sweep ('Telemetry' object)
+    :param catalog: (Optional) Catalog indexing each run as it is written ('backup.Catalog' object)
+    :return: a 'pool backup' ('IndexedPoolBackup' object)
+    """
+
+    n_positions = json_parameters["n_positions"]
+    metric_scale = scale(json_parameters)
+    rng = np.random.RandomState(0)
+
+    budget = collections.OrderedDict()
+    for p in pool_parameters:
+        budget.setdefault(effective_radius(p.r, n_positions), []).append(p)
+
+    samples = {k: {m: [] for m in METRICS} for k in budget}
+    precision = {}
+    n_dispatched = {k: 0 for k in budget}
+    n_failed = 0
+
+    with backup.PoolWriter(parameters=json_parameters, data_file=data_file, catalog=catalog) as writer, \
+            tqdm.tqdm(total=len(pool_parameters)) as progress:
+
+        to_run = [p for k in budget for p in budget[k][:min_runs]]
+
+        while to_run:
+
+            for p in to_run:
+                n_dispatched[effective_radius(p.r, n_positions)] += 1
+
+            for report in pool.imap_unordered(telemetry.Monitored(run), to_run):
+
+                progress.update()
+
+                if monitor is not None:
+                    monitor.record(report)
+
+                if report.error is not None:
+                    n_failed += report.n
+                    continue
+
+                writer.write(report.result)
+
+                summary = backup.summarize(report.result)
+                for m in METRICS:
+                    samples[effective_radius(report.result.parameters.r, n_positions)][m].append(summary[m])
+
+            to_run = []
+
+            for k in budget:
+
+                precision[k] = {m: half_width(samples[k][m], method=method, rng=rng) for m in METRICS}
+                precision[k]["n"] = len(samples[k]["distance"])
+
+                converged = all(precision[k][m] <= tolerance * metric_scale[m] for m in METRICS)
+
+                if not converged:
+                    to_run += budget[k][n_dispatched[k]:n_dispatched[k] + step]
+
+        # Analyses expect every run of the parameters: the partial file is deleted (see 'backup.PoolWriter')
+        assert not n_failed, "{} run(s) failed.".format(n_failed)
+
+        # Runs of the budget that were not needed
+        n_skipped = len(pool_parameters) - sum(n_dispatched.values())
+        progress.update(n_skipped)
+        if monitor is not None:
+            monitor.submitted(-n_skipped)
+
+        writer.parameters = dict(
+            json_parameters, r=writer.r, seed=writer.seed,
+            precision={
+                "method": method,
+                "tolerance": tolerance,
+                "effective_radius": {
+                    str(k): dict({m: _finite(precision[k][m]) for m in METRICS}, n=precision[k]["n"]) for k in budget}
+            }
+        )
+
+    return backup.IndexedPoolBackup(data_file)
@@ -0,0 +1,2 @@
+from . telemetry import *
+from . scheduling import CostModel, schedule
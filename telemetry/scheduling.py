@@ -0,0 +1,183 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import threading
+import numpy as np
+
+from model import geometry
+
+
+# Relative cost of one step given the number of strategies S, for each rule of the reference model:
+# most rules evaluate the S strategies, 'strategic' evaluates the S replies to each of them
+STEP_COST = {
+    "max_profit": lambda s: s,
+    "max_diff": lambda s: s,
+    "equal_sharing": lambda s: s,
+    "strategic": lambda s: s ** 2,
+    "strategic_k": lambda s: s,
+    "fictitious_play": lambda s: s,
+    "q_learning": lambda s: s
+}
+
+# Relative cost of building the tables of a run (S x S payoffs)
+TABLE_COST = {
+    "strategic_k": lambda s: s ** 2
+}
+
+
+def _name(move):
+    return str(move).replace("Move.", "")
+
+
+class CostModel:
+
+    """
+    Estimate the duration of runs: a prior cost in arbitrary units (from the number of strategies, the rule
+    and 't_max') times a number of seconds per unit learned for each rule from the durations measured
+    by the telemetry, and kept in a JSON file between sweeps.
+    The duration of a run of the reference model does not depend on its radius nor on its seed, so runs of a same
+    rule, size and 't_max' have the same estimate: the learned scale only ranks tasks of different rules,
+    and within a pool the estimate only sizes the chunks (see 'schedule').
+    """
+
+    def __init__(self, cost_file=None):
+
+        """
+        :param cost_file: (Optional) Path of the JSON file keeping the learned seconds per unit (string)
+        """
+
+        self.cost_file = cost_file
+        self.seconds_per_unit = {}
+
+        if cost_file is not None and os.path.exists(cost_file):
+            with open(cost_file, "r") as f:
+                self.seconds_per_unit = json.load(f)
+
+    @staticmethod
+    def units(param):
+
+        """
+        Prior cost of a run
+        :param param: Parameters ('Parameters' object)
+        :return: Cost in arbitrary units (float)
+        """
+
+        s = geometry.n_locations(param.n_positions, getattr(param, "geometry", "line")) * param.n_prices
+
+        rules = {_name(param.move), _name(getattr(param, "opp_move", None) or param.move)}
+
+        step = max(STEP_COST.get(rule, STEP_COST["max_profit"])(s) for rule in rules)
+        tables = max(TABLE_COST.get(rule, lambda x: 0)(s) for rule in rules)
+
+        return float(tables + param.t_max * step)
+
+    def scale(self, move):
+
+        # Unknown rules take the median of the known ones (only relative costs matter for scheduling)
+        if _name(move) in self.seconds_per_unit:
+            return self.seconds_per_unit[_name(move)]
+
+        if self.seconds_per_unit:
+            return float(np.median(list(self.seconds_per_unit.values())))
+
+        return 1.
+
+    def __call__(self, params):
+
+        """
+        :param params: Parameters of the runs of a task (list of 'Parameters' objects)
+        :return: Estimated duration of the task (float)
+        """
+
+        return sum(self.units(p) * self.scale(p.move) for p in params)
+
+    def learn(self, params, busy, smoothing=0.5):
+
+        """
+        Update the seconds per unit of the rules of a completed sweep.
+        :param params: Parameters of the runs (list of 'Parameters' objects)
+        :param busy: Time spent by the workers running them, in seconds (float)
+        :param smoothing: Weight of the new observation (float)
+        :return: None
+        """
+
+        units = {}
+        for p in params:
+            units[_name(p.move)] = units.get(_name(p.move), 0.) + self.units(p)
+
+        total = sum(units.values())
+        if not total or busy <= 0:
+            return
+
+        # Busy time is shared between rules in proportion of their prior cost
+        observed = busy / total
+
+        for rule in units:
+            old = self.seconds_per_unit.get(rule)
+            self.seconds_per_unit[rule] = observed if old is None else (1 - smoothing) * old + smoothing * observed
+
+        if self.cost_file is not None:
+
+            os.makedirs(os.path.dirname(self.cost_file) or ".", exist_ok=True)
+
+            # Replaced atomically: tasks of the pipeline read and write it concurrently
+            tmp_file = "{}.{}.{}.tmp".format(self.cost_file, os.getpid(), threading.get_ident())
+            with open(tmp_file, "w") as f:
+                json.dump(self.seconds_per_unit, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.cost_file)
+
+
+def schedule(tasks, cost, n_workers, merge=True, granularity=4):
+
+    """
+    Order the tasks longest first and merge the cheap ones into chunks,
+    so that workers are not left idle behind a long run at the end of a sweep,
+    without paying the dispatching overhead for each cheap run.
+    Ordering matters when estimated costs differ (e.g. batches of learning runs of different sizes); when they
+    are all equal (runs of a pool of non-learning firms), tasks keep their order and are only merged.
+    :param tasks: Tasks (list of lists of (index, 'Parameters' object))
+    :param cost: Estimated duration of a task given the parameters of its runs (callable, e.g. 'CostModel')
+    :param n_workers: Number of workers (int)
+    :param merge: If False, tasks are only reordered (e.g. for batches that cannot be merged) (bool)
+    :param granularity: Number of chunks by worker targeted (the larger, the shorter the final tail) (int)
+    :return: Chunks, to be dispatched in this order (list of lists of (index, 'Parameters' object))
+    """
+
+    costs = np.array([cost([param for _, param in task]) for task in tasks])
+
+    target = np.sum(costs) / (max(n_workers, 1) * granularity)
+
+    chunks = []
+    current, current_cost = [], 0.
+
+    for k in np.argsort(-costs, kind="stable"):
+
+        if not merge or costs[k] >= target:
+            chunks.append(tasks[k])
+            continue
+
+        current += tasks[k]
+        current_cost += costs[k]
+
+        if current_cost >= target:
+            chunks.append(current)
+            current, current_cost = [], 0.
+
+    if current:
+        chunks.append(current)
+
+    return chunks
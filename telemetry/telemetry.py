@@ -0,0 +1,174 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import json
+import os
+import time
+import traceback
+
+
+# 'n' is the number of runs covered by the call (functions may run a list of runs and return a list of results)
+Report = collections.namedtuple("Report", ["worker", "start", "end", "result", "error", "n"])
+
+
+class Monitored:
+
+    """
+    Wrap the function executed by the workers so that it reports which worker ran it, when, and whether it failed.
+    Instances can be pickled (as long as the wrapped function can), so they work with any executor.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+
+        start = time.time()
+
+        try:
+            result, error = self.func(*args, **kwargs), None
+            n = len(result) if isinstance(result, list) else 1
+
+        except Exception:
+            result, error = None, traceback.format_exc()
+            n = len(args[0]) if args and isinstance(args[0], list) else 1
+
+        return Report(worker=os.getpid(), start=start, end=time.time(), result=result, error=error, n=n)
+
+
+class Telemetry:
+
+    """
+    Keep track of the progress of a sweep and periodically write it in a JSON status file
+    (throughput per worker, ETA based on a moving average, failed runs, queue depth).
+    """
+
+    def __init__(self, status_file, n_runs=0, interval=2., window=50):
+
+        """
+        :param status_file: Path to the status file (string)
+        :param n_runs: Number of runs already submitted (int)
+        :param interval: Minimal delay between two writings of the status file, in seconds (float)
+        :param window: Number of last completions used for estimating the current throughput (int)
+        """
+
+        self.status_file = status_file
+        self.interval = interval
+
+        self.t_start = time.time()
+        self.t_last_write = 0
+
+        self.n_submitted = n_runs
+        self.n_completed = 0
+        self.n_failed = 0
+
+        self.last_completions = collections.deque(maxlen=window)
+
+        # For each worker: number of runs, time spent running, time of first start
+        self.workers = {}
+
+        self.errors = collections.deque(maxlen=5)
+
+        os.makedirs(os.path.dirname(status_file) or ".", exist_ok=True)
+
+    def submitted(self, n=1):
+        self.n_submitted += n
+
+    def record(self, report):
+
+        """
+        Take into account a run that just finished.
+        :param report: Report sent back by a 'Monitored' function ('Report' object)
+        :return: None
+        """
+
+        if report.error is None:
+            self.n_completed += report.n
+        else:
+            self.n_failed += report.n
+            self.errors.append(report.error.strip().split("\n")[-1])
+
+        self.last_completions.extend([time.time(), ] * report.n)
+
+        w = self.workers.setdefault(str(report.worker), {"runs": 0, "busy": 0., "first_start": report.start})
+        w["runs"] += report.n
+        w["busy"] += report.end - report.start
+        w["first_start"] = min(w["first_start"], report.start)
+
+        self.write()
+
+    def busy(self):
+
+        # Time spent by all the workers running tasks, in seconds
+        return sum(w["busy"] for w in self.workers.values())
+
+    def status(self):
+
+        now = time.time()
+
+        n_done = self.n_completed + self.n_failed
+        n_remaining = self.n_submitted - n_done
+
+        # Moving average of the throughput on the last completions
+        if len(self.last_completions) > 1 and self.last_completions[-1] > self.last_completions[0]:
+            rate = (len(self.last_completions) - 1) / (self.last_completions[-1] - self.last_completions[0])
+        elif n_done and now > self.t_start:
+            rate = n_done / (now - self.t_start)
+        else:
+            rate = 0.
+
+        return {
+            "submitted": self.n_submitted,
+            "completed": self.n_completed,
+            "failed": self.n_failed,
+            "queue_depth": n_remaining,
+            "elapsed": now - self.t_start,
+            "runs_per_second": rate,
+            "eta": n_remaining / rate if rate > 0 else None,
+            "workers": {
+                k: {
+                    "runs": w["runs"],
+                    "runs_per_second": w["runs"] / max(now - w["first_start"], 1e-9),
+                    "mean_run_duration": w["busy"] / w["runs"]
+                } for k, w in self.workers.items()
+            },
+            "last_errors": list(self.errors),
+            "updated": now
+        }
+
+    def write(self, force=False, **extra):
+
+        """
+        Write the status file, at most once every 'interval' seconds (unless 'force' is True).
+        The file is replaced atomically so that a reader never sees it half written.
+        """
+
+        now = time.time()
+        if not force and now - self.t_last_write < self.interval:
+            return
+
+        self.t_last_write = now
+
+        status = self.status()
+        status.update(extra)
+
+        tmp_file = self.status_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_file, self.status_file)
+
+    def close(self):
+        self.write(force=True, done=True)
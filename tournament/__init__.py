@@ -0,0 +1 @@
+from . tournament import *
@@ -0,0 +1,38 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import numpy as np
+
+from . tournament import MOVES, tournament
+
+
+parser = argparse.ArgumentParser(description='Make every couple of move rules play against each other.')
+parser.add_argument('--moves', nargs="+", default=list(MOVES))
+parser.add_argument('--radii', type=float, nargs="+", default=[0.25, 0.5])
+parser.add_argument('--n_seeds', type=int, default=10)
+parser.add_argument('--n_positions', type=int, default=21)
+parser.add_argument('--n_prices', type=int, default=11)
+parser.add_argument('--t_max', type=int, default=25)
+parser.add_argument('--file', default="data/tournament.csv",
+                    help="CSV file receiving the results table (one row by matchup and value of 'r')")
+parsed_args = parser.parse_args()
+
+tournament(
+    json_parameters={"p_min": 1, "p_max": parsed_args.n_prices, "n_prices": parsed_args.n_prices,
+                     "n_positions": parsed_args.n_positions, "t_max": parsed_args.t_max},
+    moves=parsed_args.moves, radii=parsed_args.radii,
+    seeds=[int(i) for i in np.random.RandomState(0).randint(low=1, high=2**32-1, size=parsed_args.n_seeds)],
+    file_name=parsed_args.file)
@@ -0,0 +1,184 @@
+# SpatialCompetition
+# Copyright (C) 2018  Aurélien Nioche, Basile Garcia & Nicolas Rougier
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import itertools
+import multiprocessing
+import os
+import numpy as np
+import tqdm
+
+import backup
+import model
+import parameters
+
+
+MOVES = "max_profit", "max_diff", "strategic", "equal_sharing"
+
+FIELDS = "move", "opp_move", "r", "n", "distance", "price_0", "price_1", "profit_0", "profit_1"
+
+
+def matchups(moves=MOVES):
+
+    """
+    Every ordered couple of rules (firm 0, firm 1), including a rule against itself
+    :param moves: Names of the rules (list of strings)
+    :return: Couples of rules (list of tuples of 'Move')
+    """
+
+    moves = [model.get_rule(m) for m in moves]
+
+    for m in moves:
+        assert m not in model.LEARNING, "Learning rules cannot take part in a tournament."
+
+    return list(itertools.product(moves, repeat=2))
+
+
+def tournament_parameters(json_parameters, moves=MOVES, radii=(0.25, 0.5), seeds=(1, )):
+
+    """
+    Parameters of every run of the tournament, grouped by configuration (runs sharing the same tables)
+    :param json_parameters: Parameters shared by all the runs (dictionary, as in the JSON files; 'r', 'seed',
+    'move' and 'opp_move' are ignored)
+    :param moves: Names of the rules (list of strings)
+    :param radii: Values of 'r' (list of float)
+    :param seeds: Seeds used for each matchup and each value of 'r' (list of int)
+    :return: Parameters of the runs of each configuration (list of lists of 'Parameters' objects)
+    """
+
+    common = {k: v for k, v in json_parameters.items() if k not in ("r", "seed", "move", "opp_move")}
+
+    configurations = []
+
+    for r in radii:
+
+        configurations.append([
+            parameters.Parameters(r=r, seed=seed, move=move, opp_move=opp_move, **common)
+            for (move, opp_move), seed in itertools.product(matchups(moves), seeds)
+        ])
+
+    return configurations
+
+
+def play(params):
+
+    """
+    Run matchups of the same configuration and keep only what the results table needs.
+    Tables (consumers, payoffs, lookahead) are cached in the process, so they are built once per configuration.
+    :param params: Parameters of the runs (list of 'Parameters' objects)
+    :return: Outcomes of the runs (list of dictionaries)
+    """
+
+    outcomes = []
+
+    for p in params:
+
+        b = model.FastModel(p).run()
+
+        # Outcomes of each firm on the last part of the run (distance as in the other analyses)
+        span = int(p.t_max * backup.SPAN_RATIO)
+
+        outcomes.append({
+            "move": str(p.move).replace("Move.", ""),
+            "opp_move": str(p.opp_move).replace("Move.", ""),
+            "r": p.r,
+            "distance": backup.summarize(b)["distance"],
+            "price_0": np.mean(b.prices[-span:, 0]),
+            "price_1": np.mean(b.prices[-span:, 1]),
+            "profit_0": np.mean(b.profits[-span:, 0]),
+            "profit_1": np.mean(b.profits[-span:, 1])
+        })
+
+    return outcomes
+
+
+def table(outcomes):
+
+    """
+    Average the outcomes over seeds: one row by matchup and value of 'r'
+    :param outcomes: Outcomes of the runs (list of dictionaries, see 'play')
+    :return: Rows (list of dictionaries)
+    """
+
+    groups = {}
+    for o in outcomes:
+        groups.setdefault((o["move"], o["opp_move"], o["r"]), []).append(o)
+
+    rows = []
+
+    for (move, opp_move, r), group in sorted(groups.items()):
+
+        row = {"move": move, "opp_move": opp_move, "r": r, "n": len(group)}
+        row.update({k: np.mean([o[k] for o in group]) for k in FIELDS[4:]})
+        rows.append(row)
+
+    return rows
+
+
+def tournament(json_parameters, moves=MOVES, radii=(0.25, 0.5), seeds=(1, ), file_name=None,
+               chunk_size=10, processes=None):
+
+    """
+    Round-robin tournament: every ordered couple of rules plays for each value of 'r' and each seed.
+    Runs are sent to the workers by chunks of the same configuration, so that each worker builds the tables
+    of a configuration only once.
+    :param json_parameters: Parameters shared by all the runs (dictionary)
+    :param moves: Names of the rules (list of strings)
+    :param radii: Values of 'r' (list of float)
+    :param seeds: Seeds used for each matchup and each value of 'r' (list of int)
+    :param file_name: (Optional) Path of the CSV file where the results table is exported (string)
+    :param chunk_size: Number of runs sent at once to a worker (int)
+    :param processes: Number of workers (int, default: number of CPUs)
+    :return: Results table (list of dictionaries, see 'table')
+    """
+
+    chunks = []
+    for params in tournament_parameters(json_parameters, moves=moves, radii=radii, seeds=seeds):
+        chunks += [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+
+    n_runs = sum(len(c) for c in chunks)
+
+    outcomes = []
+
+    with multiprocessing.Pool(processes=processes) as pool:
+        with tqdm.tqdm(total=n_runs) as pbar:
+            for result in pool.imap_unordered(play, chunks):
+                outcomes += result
+                pbar.update(len(result))
+
+    rows = table(outcomes)
+
+    if file_name:
+        export(rows, file_name)
+
+    return rows
+
+
+def export(rows, file_name):
+
+    """
+    Write the results table in a CSV file
+    :param rows: Results (list of dictionaries)
+    :param file_name: Path of the file (string)
+    :return: None
+    """
+
+    # Create directories if not already existing
+    os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+
+    with open(file_name, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)